@@ -0,0 +1,130 @@
+"""Бенчмарк страниц: запросы к БД, время SQL и шаблонов, p50/p95.
+
+Запуск: pytest benchmarks/
+Размер данных задают BENCH_USERS, BENCH_POSTS, BENCH_COMMENTS,
+BENCH_FOLLOWS и BENCH_IMAGES, число замеров на страницу - BENCH_REPEAT.
+Результаты сравниваются с benchmarks/baseline.json: число запросов
+не должно расти, медиана времени - выходить за допуск. Пересобрать
+эталон (вместе с изменением, которое меняет бюджет):
+BENCH_UPDATE_BASELINE=1 pytest benchmarks/
+"""
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+import pytest
+from django.template.backends.django import Template
+from django.test import override_settings
+
+from tests.fixtures.fixture_data import mixer  # noqa: F401
+from tests.fixtures.fixture_user import user, user_client  # noqa: F401
+
+from . import dataset
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+UPDATE_BASELINE = bool(os.environ.get('BENCH_UPDATE_BASELINE'))
+
+
+def env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+SIZES = {
+    'users': env_int('BENCH_USERS', 30),
+    'posts': env_int('BENCH_POSTS', 300),
+    'comments': env_int('BENCH_COMMENTS', 300),
+    'follows': env_int('BENCH_FOLLOWS', 200),
+    'images': env_int('BENCH_IMAGES', 10),
+}
+REPEAT = env_int('BENCH_REPEAT', 20)
+# Допуск по медиане времени ответа относительно эталона и абсолютный
+# запас на шум. p95 из BENCH_REPEAT замеров - почти максимум, одна пауза
+# сборщика мусора его удваивает, поэтому p95 только записывается.
+LATENCY_TOLERANCE = float(os.environ.get('BENCH_LATENCY_TOLERANCE', 1.0))
+LATENCY_SLACK_MS = float(os.environ.get('BENCH_LATENCY_SLACK_MS', 10))
+
+
+class TemplateTimer:
+    """Суммирует время рендеринга шаблонов верхнего уровня."""
+
+    def __init__(self):
+        self.total = 0.0
+        self.depth = 0
+
+    @contextmanager
+    def track(self):
+        self.total = 0.0
+        original = Template.render
+
+        def render(template, *args, **kwargs):
+            self.depth += 1
+            start = time.perf_counter()
+            try:
+                return original(template, *args, **kwargs)
+            finally:
+                self.depth -= 1
+                if not self.depth:
+                    self.total += time.perf_counter() - start
+
+        Template.render = render
+        try:
+            yield self
+        finally:
+            Template.render = original
+
+
+class SqlTimer:
+    """Суммирует время выполнения запросов; подключается execute_wrapper."""
+
+    def __init__(self):
+        self.total = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.total += time.perf_counter() - start
+
+
+@pytest.fixture(scope='session')
+def bench_dataset(django_db_setup, django_db_blocker):
+    media = tempfile.TemporaryDirectory()
+    media_settings = override_settings(MEDIA_ROOT=media.name)
+    media_settings.enable()
+    with django_db_blocker.unblock():
+        data = dataset.seed(**SIZES)
+    yield data
+    media_settings.disable()
+    media.cleanup()
+
+
+@pytest.fixture(scope='session')
+def baseline():
+    if not os.path.exists(BASELINE_PATH):
+        return {}
+    with open(BASELINE_PATH, encoding='utf-8') as file:
+        return json.load(file)
+
+
+@pytest.fixture(scope='session')
+def bench_results(baseline):
+    results = {}
+    yield results
+    if UPDATE_BASELINE and results:
+        with open(BASELINE_PATH, 'w', encoding='utf-8') as file:
+            json.dump(
+                {**baseline, **results}, file, indent=2, sort_keys=True
+            )
+            file.write('\n')
+
+
+@pytest.fixture
+def bench_client(db, bench_dataset, user, user_client):  # noqa: F811
+    from posts.models import Follow
+
+    for author in bench_dataset['authors'][:5]:
+        Follow.objects.create(user=user, author=author)
+    return user_client
@@ -0,0 +1,61 @@
+import itertools
+import random
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from mixer.backend.django import mixer
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x01\x00'
+    b'\x01\x00\x00\x00\x00\x21\xf9\x04'
+    b'\x01\x0a\x00\x01\x00\x2c\x00\x00'
+    b'\x00\x00\x01\x00\x01\x00\x00\x02'
+    b'\x02\x4c\x01\x00\x3b'
+)
+
+
+def seed(users, posts, comments, follows, images, groups=3, seed=0):
+    """Заполняет базу и возвращает аргументы для адресов бенчмарка."""
+    rnd = random.Random(seed)
+
+    def pick(objects, count):
+        return (rnd.choice(objects) for _ in range(count))
+
+    authors = mixer.cycle(users).blend(
+        User, username=(f'bench{number}' for number in range(users))
+    )
+    group_list = mixer.cycle(groups).blend(
+        Group, slug=(f'bench-{number}' for number in range(groups))
+    )
+    post_list = mixer.cycle(posts).blend(
+        Post,
+        author=pick(authors, posts),
+        group=pick(group_list + [None], posts),
+        text=(f'bench post {number}' for number in range(posts)),
+        image='',
+    )
+    for number, post in enumerate(post_list[:images]):
+        post.image.save(f'bench{number}.gif', ContentFile(SMALL_GIF))
+    pairs = [
+        (user, author)
+        for user, author in itertools.permutations(authors, 2)
+    ]
+    for user, author in rnd.sample(pairs, min(follows, len(pairs))):
+        Follow.objects.create(user=user, author=author)
+    mixer.cycle(comments).blend(
+        Comment,
+        post=pick(post_list[:max(images, 1)], comments),
+        author=pick(authors, comments),
+    )
+    author = max(authors, key=lambda user: user.stats.followers_count)
+    return {
+        'authors': authors,
+        'kwargs': {
+            'post_id': post_list[0].pk,
+            'slug': group_list[0].slug,
+            'username': author.username,
+        },
+    }
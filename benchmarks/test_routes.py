@@ -0,0 +1,91 @@
+import statistics
+import time
+
+import pytest
+from about import urls as about_urls
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts import urls as posts_urls
+from users import urls as users_urls
+
+from .conftest import (LATENCY_SLACK_MS, LATENCY_TOLERANCE, REPEAT,
+                       UPDATE_BASELINE, SqlTimer, TemplateTimer)
+
+
+def collect_routes():
+    routes = []
+    for module in (posts_urls, users_urls, about_urls):
+        for pattern in module.urlpatterns:
+            if pattern.name:
+                routes.append(f'{module.app_name}:{pattern.name}')
+    return routes
+
+
+# Параметры строки запроса для адресов, которым они нужны.
+QUERY_STRINGS = {
+    'posts:search': '?q=bench',
+}
+
+
+def route_url(route, kwargs):
+    app_name, name = route.split(':')
+    module = {
+        'posts': posts_urls, 'users': users_urls, 'about': about_urls
+    }[app_name]
+    pattern = next(p for p in module.urlpatterns if p.name == name)
+    url = reverse(route, kwargs={
+        key: kwargs[key] for key in pattern.pattern.converters
+    })
+    return url + QUERY_STRINGS.get(route, '')
+
+
+def measure(client, user, url):
+    timer = TemplateTimer()
+    latencies, sql_times, template_times, query_counts = [], [], [], []
+    # Прогрев: миниатюры, скомпилированные шаблоны и т.п.
+    client.force_login(user)
+    client.get(url)
+    for _ in range(REPEAT):
+        # Без кэша страниц, иначе замер покажет только попадание в кэш.
+        cache.clear()
+        client.force_login(user)
+        sql_timer = SqlTimer()
+        with CaptureQueriesContext(connection) as queries, timer.track():
+            with connection.execute_wrapper(sql_timer):
+                start = time.perf_counter()
+                response = client.get(url)
+                latencies.append((time.perf_counter() - start) * 1000)
+        assert response.status_code < 500, url
+        query_counts.append(len(queries))
+        sql_times.append(sql_timer.total * 1000)
+        template_times.append(timer.total * 1000)
+    percentiles = statistics.quantiles(latencies, n=20)
+    return {
+        'queries': max(query_counts),
+        'sql_ms': round(statistics.median(sql_times), 2),
+        'template_ms': round(statistics.median(template_times), 2),
+        'p50_ms': round(statistics.median(latencies), 2),
+        'p95_ms': round(percentiles[18], 2),
+    }
+
+
+@pytest.mark.parametrize('route', collect_routes())
+def test_route(route, bench_client, bench_dataset, user, baseline,
+               bench_results):
+    url = route_url(route, bench_dataset['kwargs'])
+    result = measure(bench_client, user, url)
+    bench_results[route] = result
+    expected = baseline.get(route)
+    # Новые адреса без эталона только записываются.
+    if expected is None or UPDATE_BASELINE:
+        return
+    assert result['queries'] <= expected['queries'], (
+        f'{url}: {result["queries"]} запросов к БД, '
+        f'в эталоне {expected["queries"]}'
+    )
+    limit = expected['p50_ms'] * (1 + LATENCY_TOLERANCE) + LATENCY_SLACK_MS
+    assert result['p50_ms'] <= limit, (
+        f'{url}: медиана {result["p50_ms"]} мс, допустимо {limit:.2f} мс'
+    )
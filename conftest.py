@@ -0,0 +1,8 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def sync_thumbnails(settings):
+    # Тесты tests/ и benchmarks/ подменяют MEDIA_ROOT временным каталогом:
+    # фоновый пул дописывал бы в него миниатюры уже после его удаления.
+    settings.THUMBNAIL_WORKERS = 0
@@ -0,0 +1,178 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiViewsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.reader = User.objects.create(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        Post.objects.bulk_create(
+            Post(text=f'Пост {number}', author=cls.author, group=cls.group)
+            for number in range(3)
+        )
+        cls.post = Post.objects.latest('pub_date', 'id')
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        cache.clear()
+
+    def test_feeds(self):
+        urls = [
+            reverse('api:index'),
+            reverse('api:group_list', kwargs={'slug': 'group'}),
+            reverse('api:profile', kwargs={'username': 'author'}),
+            reverse('api:follow_index'),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                data = self.reader_client.get(url).json()
+                self.assertEqual(len(data['results']), 3)
+                self.assertEqual(data['results'][0], {
+                    'id': self.post.pk,
+                    'text': self.post.text,
+                    'pub_date': data['results'][0]['pub_date'],
+                    'author': 'author',
+                    'group': 'group',
+                    'image': None,
+                    'comments_count': 1,
+                })
+
+    def test_single_query_per_page(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('api:index'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_sparse_fields(self):
+        url = reverse('api:index')
+        data = self.client.get(url, {'fields': 'id,author'}).json()
+        self.assertEqual(
+            data['results'][0], {'id': self.post.pk, 'author': 'author'}
+        )
+        response = self.client.get(url, {'fields': 'id,password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['detail'])
+
+    @override_settings(POSTS_PER_PAGE=2)
+    def test_cursor_pagination(self):
+        url = reverse('api:profile', kwargs={'username': 'author'})
+        first = self.client.get(url, {'fields': 'id'}).json()
+        self.assertIsNone(first['previous'])
+        second = self.client.get(first['next']).json()
+        self.assertIsNone(second['next'])
+        self.assertIn('fields=id', first['next'])
+        ids = [row['id'] for row in first['results'] + second['results']]
+        self.assertEqual(
+            ids,
+            list(Post.objects.order_by('-pub_date', '-id').values_list(
+                'id', flat=True
+            )),
+        )
+        back = self.client.get(second['previous']).json()
+        self.assertEqual(back['results'], first['results'])
+
+    def test_post_detail(self):
+        url = reverse('api:post_detail', kwargs={'post_id': self.post.pk})
+        data = self.client.get(url).json()
+        self.assertEqual(data['text'], self.post.text)
+        self.assertEqual(
+            [comment['text'] for comment in data['comments']['results']],
+            ['Комментарий'],
+        )
+        data = self.client.get(url, {'fields': 'comments'}).json()
+        self.assertEqual(list(data), ['comments'])
+
+    def test_errors_are_json(self):
+        responses = {
+            reverse('api:post_detail', kwargs={'post_id': 0}): 404,
+            reverse('api:group_list', kwargs={'slug': 'missing'}): 404,
+            reverse('api:follow_index'): 403,
+        }
+        for url, status in responses.items():
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, status)
+                self.assertIn('detail', response.json())
+        response = self.client.post(reverse('api:index'))
+        self.assertEqual(response.status_code, 405)
+
+    def test_not_modified_until_change(self):
+        url = reverse('api:group_list', kwargs={'slug': 'group'})
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        Post.objects.create(text='Новый', author=self.author, group=self.group)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_comment_changes_feed_etag(self):
+        url = reverse('api:profile', kwargs={'username': 'author'})
+        etag = self.client.get(url)['ETag']
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Ещё комментарий'
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['comments_count'], 2)
+
+
+class ExportViewTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.staff = User.objects.create(username='staff', is_staff=True)
+        cls.author = User.objects.create(username='author')
+        Post.objects.create(text='Пост', author=cls.author)
+
+    def setUp(self):
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+        cache.clear()
+
+    def test_staff_only(self):
+        url = reverse('api:export', kwargs={'table': 'posts'})
+        client = Client()
+        client.force_login(self.author)
+        for response in (self.client.get(url), client.get(url)):
+            self.assertEqual(response.status_code, 403)
+            self.assertIn('detail', response.json())
+
+    def test_streams_table(self):
+        url = reverse('api:export', kwargs={'table': 'posts'})
+        response = self.staff_client.get(url, {'format': 'csv'})
+        self.assertTrue(response.streaming)
+        self.assertEqual(
+            response['Content-Disposition'],
+            'attachment; filename="posts.csv"',
+        )
+        content = b''.join(response.streaming_content).decode()
+        header, row = content.splitlines()
+        self.assertTrue(header.startswith('id,pub_date,author_id'))
+        self.assertIn('Пост', row)
+
+    def test_invalid_arguments(self):
+        queries = [
+            ('posts', {'format': 'xml'}),
+            ('posts', {'after_id': 'x'}),
+            ('users', {}),
+        ]
+        for table, query in queries:
+            with self.subTest(table=table, query=query):
+                url = reverse('api:export', kwargs={'table': table})
+                response = self.staff_client.get(url, query)
+                self.assertEqual(response.status_code, 400)
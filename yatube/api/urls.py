@@ -0,0 +1,38 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'api'
+
+urlpatterns = [
+    path(
+        '',
+        views.index,
+        name='index'
+    ),
+    path(
+        'group/<slug:slug>/',
+        views.group_posts,
+        name='group_list'
+    ),
+    path(
+        'profile/<str:username>/',
+        views.profile,
+        name='profile'
+    ),
+    path(
+        'posts/<int:post_id>/',
+        views.post_detail,
+        name='post_detail'
+    ),
+    path(
+        'follow/',
+        views.follow_index,
+        name='follow_index'
+    ),
+    path(
+        'export/<slug:table>/',
+        views.export_table,
+        name='export'
+    ),
+]
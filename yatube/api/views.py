@@ -0,0 +1,249 @@
+"""JSON API только для чтения: те же ленты и посты, что и HTML-страницы.
+
+Строки берутся через values() без создания моделей, ?fields= сужает
+выборку до нужных столбцов, страницы листаются по курсору (after/before),
+а ETag строится от поколений тех же областей, что и у страниц, плюс
+COMMENTS_SCOPE для лент с comments_count.
+Сотрудникам доступна потоковая выгрузка таблиц (posts.export).
+"""
+from functools import wraps
+
+from django.conf import settings
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import condition, require_safe
+
+from posts import cache, export, lookups, timeline
+from posts.models import Comment, Post
+from posts.paginators import CursorPaginator
+from posts.views import (follow_scopes, group_scopes, index_scopes,
+                         post_detail_scopes, profile_scopes)
+
+# Имя поля в ответе -> путь для values().
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'comments_count': 'comments_count',
+}
+FEED_FIELDS = {
+    **{name: f'post__{path}' for name, path in POST_FIELDS.items()},
+    'id': 'post_id',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'created': 'created',
+    'author': 'author__username',
+}
+DETAIL_FIELDS = {**POST_FIELDS, 'comments': None}
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+def error_response(detail, status):
+    return JsonResponse({'detail': detail}, status=status)
+
+
+def api_view(view):
+    """Только GET/HEAD; ошибки - в JSON, а не HTML-страницей."""
+    @require_safe
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except Http404 as error:
+            return error_response(str(error) or 'Не найдено', 404)
+        except InvalidFields as error:
+            return error_response(str(error), 400)
+    return wrapper
+
+
+def api_login_required(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return error_response('Требуется вход', 403)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def api_staff_required(view):
+    @api_login_required
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_staff:
+            return error_response('Только для сотрудников', 403)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def with_comments(scopes):
+    """Области ленты API: comments_count меняется без правки поста.
+
+    HTML-ленты числа комментариев не показывают, поэтому поколение
+    комментариев добавляется только к тегам API.
+    """
+    @wraps(scopes)
+    def wrapper(request, *args, **kwargs):
+        scope_names = scopes(request, *args, **kwargs)
+        if scope_names is None:
+            return None
+        return [*scope_names, cache.COMMENTS_SCOPE]
+    return wrapper
+
+
+def json_response(data):
+    # Кириллица без \u-экранирования вдвое короче.
+    return JsonResponse(data, json_dumps_params={
+        'ensure_ascii': False, 'separators': (',', ':'),
+    })
+
+
+def requested_fields(request, spec):
+    raw = request.GET.get('fields')
+    if raw is None:
+        return list(spec)
+    names = list(dict.fromkeys(
+        name.strip() for name in raw.split(',') if name.strip()
+    ))
+    unknown = [name for name in names if name not in spec]
+    if unknown or not names:
+        raise InvalidFields(
+            f'Неизвестные поля: {", ".join(unknown) or "-"}; '
+            f'доступны: {", ".join(spec)}'
+        )
+    return names
+
+
+def image_url(name):
+    if not name:
+        return None
+    return Post._meta.get_field('image').storage.url(name)
+
+
+def shape(row, names, spec):
+    item = {name: row[spec[name]] for name in names}
+    if 'image' in item:
+        item['image'] = image_url(item['image'])
+    return item
+
+
+def page_link(request, cursor, token):
+    if token is None:
+        return None
+    query = request.GET.copy()
+    query.pop('after', None)
+    query.pop('before', None)
+    query[cursor] = token
+    return f'{request.path}?{query.urlencode()}'
+
+
+def paginate(request, queryset, names, spec, per_page,
+             ordering=('-pub_date', '-id')):
+    # Поля сортировки нужны курсору, даже если их не просили.
+    paths = [spec[name] for name in names]
+    paths += [name.lstrip('-') for name in ordering]
+    paginator = CursorPaginator(
+        queryset.values(*dict.fromkeys(paths)), per_page, ordering=ordering
+    )
+    page = paginator.get_page(
+        after=request.GET.get('after'), before=request.GET.get('before')
+    )
+    return {
+        'results': [shape(row, names, spec) for row in page],
+        'next': page_link(request, 'after', page.next_cursor),
+        'previous': page_link(request, 'before', page.previous_cursor),
+    }
+
+
+def posts_page(request, queryset):
+    names = requested_fields(request, POST_FIELDS)
+    return json_response(paginate(
+        request, queryset, names, POST_FIELDS, settings.POSTS_PER_PAGE
+    ))
+
+
+@api_view
+@condition(etag_func=cache.page_etag(with_comments(index_scopes)))
+def index(request):
+    return posts_page(request, Post.objects.all())
+
+
+@api_view
+@condition(etag_func=cache.page_etag(with_comments(group_scopes)))
+def group_posts(request, slug):
+    group = lookups.get_or_404(lookups.groups, slug)
+    return posts_page(request, Post.objects.filter(group=group.pk))
+
+
+@api_view
+@condition(etag_func=cache.page_etag(with_comments(profile_scopes)))
+def profile(request, username):
+    author = lookups.get_or_404(lookups.authors, username)
+    return posts_page(request, Post.objects.filter(author=author.pk))
+
+
+@api_view
+@condition(etag_func=cache.page_etag(post_detail_scopes))
+def post_detail(request, post_id):
+    names = requested_fields(request, DETAIL_FIELDS)
+    fields = [name for name in names if DETAIL_FIELDS[name] is not None]
+    row = Post.objects.filter(pk=post_id).values(
+        *[POST_FIELDS[name] for name in fields] or ['id']
+    ).first()
+    if row is None:
+        raise Http404(f'Пост {post_id} не найден')
+    item = shape(row, fields, POST_FIELDS)
+    if 'comments' in names:
+        item['comments'] = paginate(
+            request,
+            Comment.objects.filter(post=post_id),
+            list(COMMENT_FIELDS),
+            COMMENT_FIELDS,
+            settings.COMMENTS_PER_PAGE,
+            ordering=('-created', '-id'),
+        )
+    return json_response(item)
+
+
+@api_view
+@api_login_required
+@condition(etag_func=cache.page_etag(with_comments(follow_scopes)))
+def follow_index(request):
+    names = requested_fields(request, FEED_FIELDS)
+    return json_response(paginate(
+        request,
+        timeline.entries_for(request.user),
+        names,
+        FEED_FIELDS,
+        settings.POSTS_PER_PAGE,
+        ordering=('-pub_date', '-post_id'),
+    ))
+
+
+@require_safe
+@api_staff_required
+def export_table(request, table):
+    format = request.GET.get('format', 'ndjson')
+    try:
+        since = request.GET.get('since')
+        if since is not None:
+            since = export.parse_since(since)
+        after_id = request.GET.get('after_id')
+        if after_id is not None:
+            after_id = int(after_id)
+        blocks = export.stream(table, format, since, after_id)
+    except ValueError as error:
+        return error_response(str(error), 400)
+    response = StreamingHttpResponse(
+        blocks, content_type=f'{export.FORMATS[format]}; charset=utf-8'
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{table}.{format}"'
+    )
+    return response
@@ -1,5 +1,11 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from . import cache, instrumentation
+        instrumentation.install()
+        post_migrate.connect(cache.clear_after_migrate, sender=self)
@@ -0,0 +1,291 @@
+"""Двухуровневый кэш: небольшой LRU в памяти процесса поверх общего кэша.
+
+LOCATION - псевдоним общего кэша (L2) в settings.CACHES. Ключи разложены
+по корзинам; у каждой корзины в L2 лежит счётчик-эпоха, который
+увеличивает любая запись в ключ корзины. Локальная копия хранит эпоху,
+при которой её прочитали, и считается устаревшей, как только эпоха
+в L2 сменилась; clear() меняет общую эпоху всех корзин. Эпохи
+перечитываются одним get_many не чаще, чем раз в EPOCH_INTERVAL секунд, -
+столько же может жить чужое изменение, пока процесс его не заметит.
+Изменения из своего процесса видны сразу.
+
+FileCache - файловый общий кэш для одного сервера без Redis; операции
+чтение-изменение-запись в нём атомарны и между процессами.
+"""
+import fcntl
+import os
+import pickle
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+
+_MISSING = object()
+CLEARED = 'cleared'
+
+
+class _Tier:
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.epochs = {}
+        self.checked = None
+        self.lock = threading.Lock()
+
+
+# Экземпляры бэкенда создаются на каждый поток, L1 - один на процесс.
+_tiers = {}
+
+
+class TwoTierCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared_alias = location
+        self._local_timeout = options.get('LOCAL_TIMEOUT', 60)
+        self._epoch_interval = options.get('EPOCH_INTERVAL', 1)
+        self._buckets = options.get('BUCKETS', 64)
+        self._tier = _tiers.setdefault(location, _Tier())
+
+    @property
+    def _shared(self):
+        return caches[self._shared_alias]
+
+    def _full_key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _bucket(self, key):
+        return zlib.crc32(key.encode()) % self._buckets
+
+    def _epoch_key(self, bucket):
+        return f'tiers:epoch:{bucket}'
+
+    def _epoch(self, epochs, bucket):
+        return epochs.get(bucket, 0), epochs.get(CLEARED, 0)
+
+    def _sync_epochs(self):
+        tier = self._tier
+        now = time.monotonic()
+        if (
+            tier.checked is not None
+            and now - tier.checked < self._epoch_interval
+        ):
+            return
+        keys = {self._epoch_key(bucket): bucket
+                for bucket in (*range(self._buckets), CLEARED)}
+        epochs = self._shared.get_many(list(keys))
+        with tier.lock:
+            tier.epochs = {
+                bucket: epochs.get(key, 0) for key, bucket in keys.items()
+            }
+            tier.checked = now
+
+    def _snapshot(self, key):
+        bucket = self._bucket(key)
+        return bucket, self._epoch(self._tier.epochs, bucket)
+
+    def _local_get(self, key):
+        tier = self._tier
+        with tier.lock:
+            entry = tier.entries.get(key)
+            if entry is None:
+                return _MISSING
+            pickled, expires, bucket, epoch = entry
+            if expires <= time.monotonic() or (
+                self._epoch(tier.epochs, bucket) != epoch
+            ):
+                del tier.entries[key]
+                return _MISSING
+            tier.entries.move_to_end(key)
+        return pickle.loads(pickled)
+
+    def _local_set(self, key, value, timeout, bucket, epoch):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        timeout = self._local_timeout if timeout is None else min(
+            timeout, self._local_timeout
+        )
+        if timeout <= 0:
+            return
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        tier = self._tier
+        with tier.lock:
+            tier.entries[key] = (
+                pickled, time.monotonic() + timeout, bucket, epoch
+            )
+            tier.entries.move_to_end(key)
+            while len(tier.entries) > self._max_entries:
+                tier.entries.popitem(last=False)
+
+    def _invalidate(self, keys):
+        """Сбрасывает копии ключей во всех процессах; новые эпохи корзин."""
+        bumped = {
+            bucket: self._bump(bucket)
+            for bucket in {self._bucket(key) for key in keys}
+        }
+        tier = self._tier
+        with tier.lock:
+            for key in keys:
+                tier.entries.pop(key, None)
+            tier.epochs.update(bumped)
+            return {
+                bucket: self._epoch(tier.epochs, bucket) for bucket in bumped
+            }
+
+    def _bump(self, bucket):
+        epoch_key = self._epoch_key(bucket)
+        try:
+            return self._shared.incr(epoch_key)
+        except ValueError:
+            # Не начинать с нуля: старые копии не должны ожить.
+            epoch = int(time.time() * 1000)
+            self._shared.set(epoch_key, epoch, None)
+            return epoch
+
+    def get(self, key, default=None, version=None):
+        full_key = self._full_key(key, version)
+        self._sync_epochs()
+        value = self._local_get(full_key)
+        if value is not _MISSING:
+            return value
+        bucket, epoch = self._snapshot(full_key)
+        value = self._shared.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            return default
+        self._local_set(full_key, value, None, bucket, epoch)
+        return value
+
+    def get_many(self, keys, version=None):
+        self._sync_epochs()
+        found, missing = {}, {}
+        for key in keys:
+            full_key = self._full_key(key, version)
+            value = self._local_get(full_key)
+            if value is _MISSING:
+                missing[key] = (full_key, *self._snapshot(full_key))
+            else:
+                found[key] = value
+        if missing:
+            shared = self._shared.get_many(list(missing), version=version)
+            for key, value in shared.items():
+                full_key, bucket, epoch = missing[key]
+                self._local_set(full_key, value, None, bucket, epoch)
+            found.update(shared)
+        return found
+
+    def has_key(self, key, version=None):
+        self._sync_epochs()
+        if self._local_get(self._full_key(key, version)) is not _MISSING:
+            return True
+        return self._shared.has_key(key, version=version)
+
+    def _store_local(self, key, value, timeout, version):
+        full_key = self._full_key(key, version)
+        bumped = self._invalidate([full_key])
+        bucket = self._bucket(full_key)
+        self._local_set(full_key, value, timeout, bucket, bumped[bucket])
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._shared.set(key, value, timeout, version=version)
+        self._store_local(key, value, timeout, version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        if not self._shared.add(key, value, timeout, version=version):
+            return False
+        self._store_local(key, value, timeout, version)
+        return True
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self._shared.set_many(data, timeout, version=version)
+        self._invalidate([self._full_key(key, version) for key in data])
+        return failed
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        touched = self._shared.touch(key, timeout, version=version)
+        self._invalidate([self._full_key(key, version)])
+        return touched
+
+    def incr(self, key, delta=1, version=None):
+        value = self._shared.incr(key, delta, version=version)
+        self._invalidate([self._full_key(key, version)])
+        return value
+
+    def decr(self, key, delta=1, version=None):
+        return self.incr(key, -delta, version=version)
+
+    def delete(self, key, version=None):
+        self._shared.delete(key, version=version)
+        self._invalidate([self._full_key(key, version)])
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self._shared.delete_many(keys, version=version)
+        self._invalidate([self._full_key(key, version) for key in keys])
+
+    def clear(self):
+        self._shared.clear()
+        epoch = self._bump(CLEARED)
+        tier = self._tier
+        with tier.lock:
+            tier.entries.clear()
+            tier.epochs = {CLEARED: epoch}
+            tier.checked = time.monotonic()
+
+
+class FileCache(FileBasedCache):
+    """FileBasedCache с add и incr под блокировкой файла.
+
+    У Django обе операции - проверка и запись отдельными шагами, и два
+    процесса могут, например, потерять одно из увеличений поколения.
+    incr сохраняет срок жизни ключа.
+    """
+
+    def _locked(self):
+        self._createdir()
+        lock = open(os.path.join(self._dir, '.lock'), 'a')
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        return lock
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        with self._locked():
+            return super().add(key, value, timeout, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        # BaseCache.incr перезаписал бы значение через set() со сроком
+        # по умолчанию, и вечные счётчики начали бы истекать.
+        fname = self._key_to_file(key, version)
+        with self._locked():
+            try:
+                with open(fname, 'rb') as f:
+                    expiry = pickle.load(f)
+                    if expiry is not None and expiry < time.time():
+                        raise FileNotFoundError
+                    value = pickle.loads(zlib.decompress(f.read()))
+            except (FileNotFoundError, EOFError):
+                raise ValueError(f"Key '{key}' not found")
+            value += delta
+            fd, tmp_path = tempfile.mkstemp(dir=self._dir)
+            try:
+                with open(fd, 'wb') as f:
+                    f.write(pickle.dumps(expiry, self.pickle_protocol))
+                    f.write(zlib.compress(
+                        pickle.dumps(value, self.pickle_protocol)
+                    ))
+                os.replace(tmp_path, fname)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+        return value
+
+
+def clear_after_migrate(**kwargs):
+    """Кэш может хранить объекты старой схемы или другой базы данных."""
+    for alias in settings.CACHES:
+        caches[alias].clear()
@@ -0,0 +1,33 @@
+import base64
+import json
+import re
+
+from django.template.loader import render_to_string
+
+HOLE_RE = re.compile(r'<!--hole:([A-Za-z0-9_-]+)-->')
+
+
+def punch(template_name, params):
+    """Метка на месте персональной части страницы."""
+    raw = json.dumps([template_name, params], separators=(',', ':'))
+    token = base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+    return f'<!--hole:{token}-->'
+
+
+def fill(request, content, context=None):
+    """Дорисовывает в общий каркас страницы части текущего пользователя."""
+    context = context or {}
+
+    def render_hole(match):
+        token = match.group(1)
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        template_name, params = json.loads(raw.decode())
+        return render_to_string(
+            template_name, {**context, **params}, request=request
+        )
+
+    return HOLE_RE.sub(render_hole, content)
+
+
+def is_skeleton(request):
+    return getattr(request, 'render_skeleton', False)
@@ -0,0 +1,142 @@
+"""Сбор метрик запроса: SQL, шаблоны, кэш.
+
+Хуки шаблонов и кэша ставятся один раз при запуске и ничего не делают,
+пока для текущего запроса не открыт collect(), поэтому запросы, не
+попавшие в выборку, почти ничего не стоят.
+"""
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.template.backends.django import Template
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._template_depth = 0
+        self._in_cache = False
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.sql_time += time.perf_counter() - start
+
+
+class QueryCounter:
+    def __init__(self):
+        self.queries = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+
+def current():
+    return _current.get()
+
+
+@contextmanager
+def wrap_connections(wrapper):
+    """Подключает execute_wrapper ко всем соединениям с БД."""
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(wrapper))
+        yield wrapper
+
+
+@contextmanager
+def collect():
+    metrics = RequestMetrics()
+    token = _current.set(metrics)
+    try:
+        with wrap_connections(metrics):
+            yield metrics
+    finally:
+        _current.reset(token)
+
+
+def _timed_render(render):
+    @wraps(render)
+    def wrapper(template, *args, **kwargs):
+        metrics = _current.get()
+        if metrics is None:
+            return render(template, *args, **kwargs)
+        # Вложенные шаблоны (include, hole) уже входят во внешний.
+        metrics._template_depth += 1
+        start = time.perf_counter()
+        try:
+            return render(template, *args, **kwargs)
+        finally:
+            metrics._template_depth -= 1
+            if not metrics._template_depth:
+                metrics.template_time += time.perf_counter() - start
+    wrapper.instrumented = True
+    return wrapper
+
+
+def _counted_get(get):
+    @wraps(get)
+    def wrapper(cache, key, default=None, version=None):
+        metrics = _current.get()
+        if metrics is None or metrics._in_cache:
+            return get(cache, key, default, version)
+        metrics._in_cache = True
+        try:
+            value = get(cache, key, default, version)
+        finally:
+            metrics._in_cache = False
+        if value is default:
+            metrics.cache_misses += 1
+        else:
+            metrics.cache_hits += 1
+        return value
+    wrapper.instrumented = True
+    return wrapper
+
+
+def _counted_get_many(get_many):
+    @wraps(get_many)
+    def wrapper(cache, keys, version=None):
+        metrics = _current.get()
+        if metrics is None or metrics._in_cache:
+            return get_many(cache, keys, version)
+        keys = list(keys)
+        # BaseCache.get_many вызывает get для каждого ключа - не считаем их.
+        metrics._in_cache = True
+        try:
+            values = get_many(cache, keys, version)
+        finally:
+            metrics._in_cache = False
+        metrics.cache_hits += len(values)
+        metrics.cache_misses += len(keys) - len(values)
+        return values
+    wrapper.instrumented = True
+    return wrapper
+
+
+def _patch(cls, name, decorator):
+    method = getattr(cls, name)
+    if not getattr(method, 'instrumented', False):
+        setattr(cls, name, decorator(method))
+
+
+def install():
+    _patch(Template, 'render', _timed_render)
+    for alias in settings.CACHES:
+        backend = type(caches[alias])
+        _patch(backend, 'get', _counted_get)
+        _patch(backend, 'get_many', _counted_get_many)
@@ -0,0 +1,90 @@
+from timeit import Timer
+
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.template import Context, Template
+from django.template.loader import get_template
+
+# Прежняя версия paginator.html: ссылка на каждую страницу.
+FULL_RANGE_TEMPLATE = """
+{% if page_obj.has_other_pages %}
+  <nav aria-label="Page navigation" class="my-5">
+    <ul class="pagination">
+      {% if page_obj.has_previous %}
+        <li class="page-item">
+          <a class="page-link" href="?page=1">Первая</a>
+        </li>
+        <li class="page-item">
+          <a class="page-link"
+             href="?page={{ page_obj.previous_page_number }}">
+            Предыдущая
+          </a>
+        </li>
+      {% endif %}
+      {% for i in page_obj.paginator.page_range %}
+        {% if page_obj.number == i %}
+          <li class="page-item active">
+            <span class="page-link">{{ i }}</span>
+          </li>
+        {% else %}
+          <li class="page-item">
+            <a class="page-link" href="?page={{ i }}">{{ i }}</a>
+          </li>
+        {% endif %}
+      {% endfor %}
+      {% if page_obj.has_next %}
+        <li class="page-item">
+          <a class="page-link" href="?page={{ page_obj.next_page_number }}">
+            Следующая
+          </a>
+        </li>
+        <li class="page-item">
+          <a class="page-link" href="?page={{ page_obj.paginator.num_pages }}">
+            Последняя
+          </a>
+        </li>
+      {% endif %}
+    </ul>
+  </nav>
+{% endif %}
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает размер и время рендера paginator.html '
+        'с полным и оконным списком страниц'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pages', type=int, nargs='+', default=[10, 1000, 100000]
+        )
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        templates = (
+            ('full', Template(FULL_RANGE_TEMPLATE)),
+            ('window', get_template('posts/includes/paginator.html')),
+        )
+        self.stdout.write(
+            f'{"pages":>8} {"variant":>8} {"bytes":>10} {"ms/render":>10}'
+        )
+        for num_pages in options['pages']:
+            paginator = Paginator(range(num_pages), 1)
+            page_obj = paginator.get_page(num_pages // 2 or 1)
+            for name, template in templates:
+                render = self.renderer(template, page_obj)
+                size = len(render().encode())
+                repeat = options['repeat'] if num_pages < 10000 else 1
+                seconds = Timer(render).timeit(repeat) / repeat
+                self.stdout.write(
+                    f'{num_pages:>8} {name:>8} {size:>10} '
+                    f'{seconds * 1000:>10.3f}'
+                )
+
+    @staticmethod
+    def renderer(template, page_obj):
+        if isinstance(template, Template):
+            return lambda: template.render(Context({'page_obj': page_obj}))
+        return lambda: template.render({'page_obj': page_obj})
@@ -0,0 +1,269 @@
+"""Метрики запросов по именам маршрутов, общие для всех процессов.
+
+Каждый процесс пишет счётчики в свой файл METRICS_DIR/metrics_<pid>.db,
+отображённый в память; эндпоинт метрик складывает файлы всех процессов
+и отдаёт их в текстовом формате Prometheus. Файлы завершившихся
+процессов сливаются в metrics_archive.db, чтобы счётчики не убывали, а
+каталог не рос. METRICS_DIR = None отключает запись (так в тестах).
+"""
+import fcntl
+import glob
+import mmap
+import os
+import struct
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+
+COUNTER = 'counter'
+HISTOGRAM = 'histogram'
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+QUERY_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+FAMILIES = {
+    'yatube_http_requests_total': (
+        COUNTER, 'Число запросов по маршрутам и кодам ответа.'
+    ),
+    'yatube_http_request_duration_seconds': (
+        HISTOGRAM, 'Время ответа по маршрутам.'
+    ),
+    'yatube_http_request_queries': (
+        HISTOGRAM, 'Число SQL-запросов на ответ по маршрутам.'
+    ),
+    'yatube_http_response_bytes_total': (
+        COUNTER, 'Объём тел ответов по маршрутам.'
+    ),
+}
+
+_HEADER = struct.Struct('i')
+_LENGTH = struct.Struct('i')
+_VALUE = struct.Struct('d')
+_INITIAL_SIZE = 1 << 16
+
+
+class MmapedValues:
+    """Словарь имя -> число с плавающей точкой в файле, отображённом в память.
+
+    Запись: длина ключа, ключ (с выравниванием до 8 байт), значение.
+    Заголовок хранит занятый объём; он сдвигается после записи, так что
+    читатели из других процессов видят только целые записи.
+    """
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._file = open(path, 'a+b')
+        if os.fstat(self._file.fileno()).st_size == 0:
+            self._file.truncate(_INITIAL_SIZE)
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        self._positions = {}
+        used = _HEADER.unpack_from(self._map, 0)[0]
+        if not used:
+            used = 8
+            _HEADER.pack_into(self._map, 0, used)
+        self._used = used
+        for key, _, position in self._entries(self._map, used):
+            self._positions[key] = position
+
+    @staticmethod
+    def _entries(data, used):
+        position = 8
+        while position < used:
+            length = _LENGTH.unpack_from(data, position)[0]
+            start = position + _LENGTH.size
+            key = bytes(data[start:start + length]).decode()
+            position = start + _padded(length)
+            yield key, _VALUE.unpack_from(data, position)[0], position
+            position += _VALUE.size
+
+    def _add_key(self, key):
+        encoded = key.encode()
+        record = _LENGTH.pack(len(encoded)) + encoded.ljust(
+            _padded(len(encoded)), b' '
+        ) + _VALUE.pack(0.0)
+        while self._used + len(record) > len(self._map):
+            size = len(self._map) * 2
+            self._map.close()
+            self._file.truncate(size)
+            self._map = mmap.mmap(self._file.fileno(), 0)
+        self._map[self._used:self._used + len(record)] = record
+        position = self._used + len(record) - _VALUE.size
+        self._used += len(record)
+        _HEADER.pack_into(self._map, 0, self._used)
+        self._positions[key] = position
+        return position
+
+    def add(self, key, amount):
+        with self._lock:
+            position = self._positions.get(key)
+            if position is None:
+                position = self._add_key(key)
+            value = _VALUE.unpack_from(self._map, position)[0]
+            _VALUE.pack_into(self._map, position, value + amount)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    @classmethod
+    def read(cls, path):
+        with open(path, 'rb') as source:
+            data = source.read()
+        if len(data) < 8:
+            return
+        used = min(_HEADER.unpack_from(data, 0)[0], len(data))
+        for key, value, _ in cls._entries(data, used):
+            yield key, value
+
+
+def _padded(length):
+    # Значение после ключа выравнивается по 8 байтам.
+    return length + (-(length + _LENGTH.size) % 8)
+
+
+_store = None
+_store_owner = None
+_store_lock = threading.Lock()
+
+ARCHIVE_NAME = 'metrics_archive.db'
+
+
+def _is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def reap(directory):
+    """Сливает файлы завершившихся процессов в архив и удаляет их.
+
+    Каталог общий для воркеров, поэтому слияние идёт под блокировкой
+    файла: иначе два процесса могли бы учесть один файл дважды.
+    """
+    with open(os.path.join(directory, 'reap.lock'), 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        archive = None
+        try:
+            for path in glob.glob(os.path.join(directory, 'metrics_*.db')):
+                pid = os.path.basename(path)[len('metrics_'):-len('.db')]
+                if not pid.isdigit() or _is_alive(int(pid)):
+                    continue
+                if archive is None:
+                    archive = MmapedValues(
+                        os.path.join(directory, ARCHIVE_NAME)
+                    )
+                for key, value in MmapedValues.read(path):
+                    archive.add(key, value)
+                os.remove(path)
+        finally:
+            if archive is not None:
+                archive.close()
+
+
+def _values():
+    global _store, _store_owner
+    owner = (os.getpid(), settings.METRICS_DIR)
+    if _store_owner != owner:
+        with _store_lock:
+            if _store_owner != owner:
+                if _store is not None:
+                    _store.close()
+                os.makedirs(settings.METRICS_DIR, exist_ok=True)
+                reap(settings.METRICS_DIR)
+                path = os.path.join(
+                    settings.METRICS_DIR, f'metrics_{owner[0]}.db'
+                )
+                _store, _store_owner = MmapedValues(path), owner
+    return _store
+
+
+def _labels(**labels):
+    pairs = ','.join(
+        f'{name}="{_escape(value)}"' for name, value in labels.items()
+    )
+    return '{' + pairs + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace(
+        '\n', r'\n'
+    )
+
+
+def inc(name, amount=1, **labels):
+    _values().add(name + _labels(**labels), amount)
+
+
+def observe(name, value, buckets, **labels):
+    values = _values()
+    for bound in buckets:
+        if value <= bound:
+            values.add(f'{name}_bucket' + _labels(**labels, le=bound), 1)
+    values.add(f'{name}_bucket' + _labels(**labels, le='+Inf'), 1)
+    values.add(f'{name}_sum' + _labels(**labels), value)
+    values.add(f'{name}_count' + _labels(**labels), 1)
+
+
+def record_request(view, status, duration, queries, size):
+    if settings.METRICS_DIR is None:
+        return
+    inc('yatube_http_requests_total', view=view, status=status)
+    observe(
+        'yatube_http_request_duration_seconds', duration, LATENCY_BUCKETS,
+        view=view,
+    )
+    observe('yatube_http_request_queries', queries, QUERY_BUCKETS, view=view)
+    if size is not None:
+        inc('yatube_http_response_bytes_total', size, view=view)
+
+
+def collect():
+    """Сумма значений из файлов всех процессов."""
+    totals = defaultdict(float)
+    if settings.METRICS_DIR is None:
+        return totals
+    pattern = os.path.join(settings.METRICS_DIR, 'metrics_*.db')
+    for path in glob.glob(pattern):
+        for key, value in MmapedValues.read(path):
+            totals[key] += value
+    return totals
+
+
+def _family(sample):
+    name = sample.split('{', 1)[0]
+    for suffix in ('_bucket', '_sum', '_count'):
+        if name.endswith(suffix) and name[:-len(suffix)] in FAMILIES:
+            return name[:-len(suffix)]
+    return name
+
+
+def _bucket_order(sample):
+    # Корзины гистограммы - по возрастанию границы, +Inf последней.
+    head, _, bound = sample.rpartition('le="')
+    if not head:
+        return sample, 0
+    bound = bound.rstrip('"}')
+    return head, float('inf') if bound == '+Inf' else float(bound)
+
+
+def exposition():
+    samples = defaultdict(list)
+    for key, value in collect().items():
+        samples[_family(key)].append((key, value))
+    lines = []
+    for family in sorted(samples):
+        kind, description = FAMILIES.get(family, ('untyped', ''))
+        lines.append(f'# HELP {family} {description}')
+        lines.append(f'# TYPE {family} {kind}')
+        for key, value in sorted(
+            samples[family], key=lambda item: _bucket_order(item[0])
+        ):
+            lines.append(f'{key} {value!r}')
+    return '\n'.join(lines) + '\n'
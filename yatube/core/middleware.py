@@ -0,0 +1,102 @@
+import json
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import instrumentation, metrics, nplusone
+
+logger = logging.getLogger('core.performance')
+nplusone_logger = logging.getLogger('core.nplusone')
+
+
+def server_timing(sample, view_time):
+    return ', '.join([
+        f'db;dur={sample.sql_time * 1000:.2f};desc="{sample.queries} SQL"',
+        f'tpl;dur={sample.template_time * 1000:.2f}',
+        f'cache;desc="hits {sample.cache_hits}, '
+        f'misses {sample.cache_misses}"',
+        f'view;dur={view_time * 1000:.2f}',
+    ])
+
+
+class MetricsMiddleware:
+    """Пишет число, время, SQL-запросы и объём ответов по маршрутам."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        with instrumentation.wrap_connections(
+            instrumentation.QueryCounter()
+        ) as counter:
+            response = self.get_response(request)
+        match = request.resolver_match
+        metrics.record_request(
+            view=match.view_name if match else 'unresolved',
+            status=response.status_code,
+            duration=time.perf_counter() - start,
+            queries=counter.queries,
+            size=None if response.streaming else len(response.content),
+        )
+        return response
+
+
+class PerformanceMiddleware:
+    """Замеряет выборку запросов: Server-Timing и строка лога в JSON.
+
+    Доля замеряемых запросов - PERFORMANCE_SAMPLE_RATE (от 0 до 1).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = getattr(settings, 'PERFORMANCE_SAMPLE_RATE', 0)
+        if rate <= 0 or random.random() >= rate:
+            return self.get_response(request)
+        start = time.perf_counter()
+        with instrumentation.collect() as sample:
+            response = self.get_response(request)
+        view_time = time.perf_counter() - start
+        response['Server-Timing'] = server_timing(sample, view_time)
+        match = request.resolver_match
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'queries': sample.queries,
+            'sql_ms': round(sample.sql_time * 1000, 2),
+            'template_ms': round(sample.template_time * 1000, 2),
+            'cache_hits': sample.cache_hits,
+            'cache_misses': sample.cache_misses,
+            'view_ms': round(view_time * 1000, 2),
+        }, ensure_ascii=False))
+        return response
+
+
+class NPlusOneMiddleware:
+    """В режиме отладки пишет в лог повторы запросов одной формы.
+
+    Повтором считается форма, выполненная больше NPLUSONE_THRESHOLD раз.
+    """
+
+    def __init__(self, get_response):
+        if not settings.DEBUG or not settings.NPLUSONE_THRESHOLD:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with nplusone.detect() as shapes:
+            response = self.get_response(request)
+        repeated = shapes.repeated(settings.NPLUSONE_THRESHOLD)
+        if repeated:
+            nplusone_logger.warning(
+                'N+1 %s %s\n%s',
+                request.method, request.path, nplusone.report(repeated),
+            )
+        return response
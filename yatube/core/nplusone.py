@@ -0,0 +1,113 @@
+"""Поиск N+1: запросы одной формы, повторённые внутри запроса к сайту.
+
+Форма запроса - SQL без значений: строки, числа и списки IN сведены
+к заглушкам. Для повторов запоминается, откуда они пришли: строка
+шаблона и ближайший кадр кода проекта.
+"""
+import os
+import re
+import sys
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.template import base as template_base
+
+from . import instrumentation
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_SPACE = re.compile(r'\s+')
+
+_TEMPLATE_BASE = template_base.__file__
+_SKIP_FILES = {
+    os.path.abspath(__file__),
+    os.path.abspath(instrumentation.__file__),
+}
+
+
+def normalize(sql):
+    sql = _STRING.sub('?', sql).replace('%s', '?')
+    sql = _IN_LIST.sub('(...)', _NUMBER.sub('?', sql))
+    return _SPACE.sub(' ', sql).strip()
+
+
+def _is_project_file(filename):
+    return (
+        filename.startswith(settings.BASE_DIR)
+        and 'site-packages' not in filename
+        and filename not in _SKIP_FILES
+    )
+
+
+def query_origin():
+    """Строка шаблона и кадр кода проекта, ближайшие к запросу."""
+    template_line = python_frame = None
+    frame = sys._getframe(1)
+    while frame is not None and template_line is None:
+        code = frame.f_code
+        if (
+            code.co_name == 'render_annotated'
+            and code.co_filename == _TEMPLATE_BASE
+        ):
+            node = frame.f_locals.get('self')
+            token = getattr(node, 'token', None)
+            origin = getattr(node, 'origin', None)
+            if token is not None and origin is not None:
+                name = origin.template_name or origin.name
+                template_line = f'{name}:{token.lineno}'
+        elif python_frame is None and _is_project_file(code.co_filename):
+            path = os.path.relpath(code.co_filename, settings.BASE_DIR)
+            python_frame = f'{path}:{frame.f_lineno} in {code.co_name}'
+        frame = frame.f_back
+    return ' <- '.join(filter(None, [python_frame, template_line])) or '?'
+
+
+class QueryShapes:
+    def __init__(self):
+        self.counts = Counter()
+        self.origins = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        shape = normalize(sql)
+        self.counts[shape] += 1
+        if self.counts[shape] > 1:
+            self.origins.setdefault(shape, Counter())[query_origin()] += 1
+        return execute(sql, params, many, context)
+
+    def repeated(self, threshold):
+        return [
+            (shape, count, self.origins[shape].most_common(1)[0][0])
+            for shape, count in self.counts.most_common()
+            if count > threshold
+        ]
+
+
+@contextmanager
+def detect():
+    with instrumentation.wrap_connections(QueryShapes()) as shapes:
+        yield shapes
+
+
+def report(repeated):
+    return '\n'.join(
+        f'{count} x {shape}\n    at {origin}'
+        for shape, count, origin in repeated
+    )
+
+
+class NPlusOneAssertionsMixin:
+    """Для TestCase: assertNoRepeatedQueries() роняет тест при N+1."""
+
+    @contextmanager
+    def assertNoRepeatedQueries(self, threshold=None):
+        if threshold is None:
+            threshold = settings.NPLUSONE_THRESHOLD
+        with detect() as shapes:
+            yield shapes
+        repeated = shapes.repeated(threshold)
+        if repeated:
+            self.fail(
+                'Повторяющиеся запросы (N+1):\n' + report(repeated)
+            )
@@ -0,0 +1,21 @@
+from django import template
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+from core.holes import is_skeleton, punch
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, template_name, **params):
+    """Персональная часть страницы.
+
+    В общем каркасе, который кэшируется для всех пользователей,
+    оставляет метку, иначе сразу подключает шаблон, как include.
+    """
+    request = context.get('request')
+    if request is not None and is_skeleton(request):
+        return mark_safe(punch(template_name, params))
+    with context.push(**params):
+        return get_template(template_name).template.render(context)
@@ -6,3 +6,22 @@ register = template.Library()
 @register.filter
 def addclass(field, css):
     return field.as_widget(attrs={'class': css})
+
+
+@register.filter
+def page_window(page, size=2):
+    """Номера страниц вокруг текущей; None - место для многоточия."""
+    last = page.paginator.num_pages
+    start = max(page.number - size, 1)
+    end = min(page.number + size, last)
+    pages = []
+    if start > 1:
+        pages.append(1)
+        if start > 2:
+            pages.append(None)
+    pages.extend(range(start, end + 1))
+    if end < last:
+        if end < last - 1:
+            pages.append(None)
+        pages.append(last)
+    return pages
@@ -0,0 +1,110 @@
+import pickle
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import caches
+from django.test import SimpleTestCase
+
+from core.cache import FileCache, TwoTierCache, _Tier
+
+
+def process_cache(**options):
+    """Кэш с собственным L1, как в отдельном процессе."""
+    cache = TwoTierCache(
+        'shared', {'OPTIONS': {'EPOCH_INTERVAL': 0, **options}}
+    )
+    cache._tier = _Tier()
+    return cache
+
+
+class TwoTierCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.shared = caches['shared']
+        self.shared.clear()
+
+    def test_local_copy_served_without_shared_read(self):
+        cache = process_cache()
+        cache.set('key', 'value')
+        self.shared.delete('key')
+        self.assertEqual(cache.get('key'), 'value')
+        self.assertEqual(cache.get_many(['key']), {'key': 'value'})
+
+    def test_write_in_other_process_invalidates_copy(self):
+        first, second = process_cache(), process_cache()
+        first.set('key', 'old')
+        self.assertEqual(second.get('key'), 'old')
+        first.set('key', 'new')
+        self.assertEqual(second.get('key'), 'new')
+        first.add('counter', 1)
+        self.assertEqual(second.get('counter'), 1)
+        first.incr('counter')
+        self.assertEqual(second.get('counter'), 2)
+        first.delete('key')
+        self.assertIsNone(second.get('key'))
+
+    def test_clear_reaches_other_processes(self):
+        first, second = process_cache(), process_cache()
+        first.set('key', 'value')
+        self.assertEqual(second.get('key'), 'value')
+        first.clear()
+        self.assertIsNone(second.get('key'))
+
+    def test_local_tier_is_bounded(self):
+        cache = process_cache(MAX_ENTRIES=2)
+        cache.set_many({'a': 1, 'b': 2})
+        for key in ('a', 'b', 'c'):
+            self.shared.set(key, key)
+            cache.get(key)
+        self.shared.delete_many(['a', 'b', 'c'])
+        self.assertEqual(cache.get_many(['a', 'b', 'c']), {'b': 'b', 'c': 'c'})
+
+
+class FileCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def file_cache(self):
+        # Отдельный экземпляр - отдельные файлы, как в другом процессе.
+        return FileCache(self.directory, {'TIMEOUT': None})
+
+    def test_concurrent_increments_are_not_lost(self):
+        self.file_cache().set('generation', 0)
+
+        def bump(_):
+            for _ in range(25):
+                self.file_cache().incr('generation')
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(bump, range(8)))
+        self.assertEqual(self.file_cache().get('generation'), 200)
+
+    def test_add_once(self):
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            added = list(executor.map(
+                lambda number: self.file_cache().add('lock', number),
+                range(8),
+            ))
+        self.assertEqual(added.count(True), 1)
+        with self.assertRaises(ValueError):
+            self.file_cache().incr('missing')
+
+    def test_incr_keeps_expiry(self):
+        cache = FileCache(self.directory, {'TIMEOUT': 300})
+        cache.set('forever', 1, None)
+        cache.set('hour', 1, 3600)
+        expiries = {
+            key: self.expiry(cache, key) for key in ('forever', 'hour')
+        }
+        cache.incr('forever')
+        cache.incr('hour', 5)
+        self.assertEqual(cache.get_many(['forever', 'hour']),
+                         {'forever': 2, 'hour': 6})
+        for key, expiry in expiries.items():
+            self.assertEqual(self.expiry(cache, key), expiry)
+        self.assertIsNone(expiries['forever'])
+
+    def expiry(self, cache, key):
+        with open(cache._key_to_file(key), 'rb') as f:
+            return pickle.load(f)
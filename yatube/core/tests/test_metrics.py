@@ -0,0 +1,114 @@
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import metrics
+
+User = get_user_model()
+TEMP_METRICS_DIR = tempfile.mkdtemp()
+
+
+@override_settings(METRICS_DIR=TEMP_METRICS_DIR)
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.staff = User.objects.create(username='staff', is_staff=True)
+        cls.user = User.objects.create(username='user')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_METRICS_DIR, ignore_errors=True)
+
+    def setUp(self):
+        for name in os.listdir(TEMP_METRICS_DIR):
+            os.remove(os.path.join(TEMP_METRICS_DIR, name))
+        metrics._store_owner = None
+
+    def test_values_survive_reopen_and_growth(self):
+        path = os.path.join(TEMP_METRICS_DIR, 'metrics_1.db')
+        values = metrics.MmapedValues(path)
+        for number in range(3000):
+            values.add(f'sample{{n="{number}"}}', number)
+        values.add('sample{n="7"}', 0.5)
+        values.close()
+        reopened = metrics.MmapedValues(path)
+        reopened.add('sample{n="7"}', 1)
+        reopened.close()
+        stored = dict(metrics.MmapedValues.read(path))
+        self.assertEqual(len(stored), 3000)
+        self.assertEqual(stored['sample{n="7"}'], 8.5)
+
+    def test_processes_are_summed(self):
+        for pid in (1, 2):
+            values = metrics.MmapedValues(
+                os.path.join(TEMP_METRICS_DIR, f'metrics_{pid}.db')
+            )
+            values.add('yatube_http_requests_total{view="posts:index"}', 2)
+            values.close()
+        self.assertIn(
+            'yatube_http_requests_total{view="posts:index"} 4.0',
+            metrics.exposition(),
+        )
+
+    def test_finished_processes_are_archived(self):
+        dead_pid = 2 ** 30
+        for pid in (dead_pid, os.getpid()):
+            values = metrics.MmapedValues(
+                os.path.join(TEMP_METRICS_DIR, f'metrics_{pid}.db')
+            )
+            values.add('yatube_http_requests_total{view="posts:index"}', 2)
+            values.close()
+        metrics.reap(TEMP_METRICS_DIR)
+        self.assertEqual(
+            sorted(
+                name for name in os.listdir(TEMP_METRICS_DIR)
+                if name.endswith('.db')
+            ),
+            sorted([metrics.ARCHIVE_NAME, f'metrics_{os.getpid()}.db']),
+        )
+        self.assertIn(
+            'yatube_http_requests_total{view="posts:index"} 4.0',
+            metrics.exposition(),
+        )
+
+    @override_settings(METRICS_DIR=None)
+    def test_disabled(self):
+        Client().get(reverse('posts:index'))
+        self.assertEqual(metrics.exposition(), '\n')
+        self.assertEqual(os.listdir(TEMP_METRICS_DIR), [])
+
+    def test_endpoint(self):
+        Client().get(reverse('posts:index'))
+        Client().get(reverse('posts:index'))
+        url = reverse('metrics')
+        self.assertEqual(Client().get(url).status_code, 302)
+        client = Client()
+        client.force_login(self.user)
+        self.assertEqual(client.get(url).status_code, 302)
+        client.force_login(self.staff)
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        text = response.content.decode()
+        self.assertIn('# TYPE yatube_http_request_duration_seconds histogram',
+                      text)
+        self.assertIn(
+            'yatube_http_requests_total{view="posts:index",status="200"} 2.0',
+            text,
+        )
+        self.assertIn(
+            'yatube_http_request_duration_seconds_bucket'
+            '{view="posts:index",le="+Inf"} 2.0',
+            text,
+        )
+        self.assertIn(
+            'yatube_http_request_queries_count{view="posts:index"} 2.0', text
+        )
+        self.assertIn(
+            'yatube_http_response_bytes_total{view="posts:index"}', text
+        )
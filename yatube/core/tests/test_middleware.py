@@ -0,0 +1,47 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.models import Post
+
+User = get_user_model()
+
+
+class PerformanceMiddlewareTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        author = User.objects.create(username='author')
+        Post.objects.create(text='Пост', author=author)
+
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(PERFORMANCE_SAMPLE_RATE=1)
+    def test_sampled_request(self):
+        with self.assertLogs('core.performance', 'INFO') as logs:
+            with CaptureQueriesContext(connection) as queries:
+                response = Client().get(reverse('posts:index'))
+        timing = response['Server-Timing']
+        for metric in ('db;dur=', 'tpl;dur=', 'cache;desc=', 'view;dur='):
+            self.assertIn(metric, timing)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'posts:index')
+        self.assertEqual(record['status'], 200)
+        self.assertEqual(record['queries'], len(queries))
+        self.assertGreater(record['template_ms'], 0)
+        self.assertGreater(record['cache_misses'], 0)
+
+        with self.assertLogs('core.performance', 'INFO') as logs:
+            Client().get(reverse('posts:index'))
+        record = json.loads(logs.records[0].getMessage())
+        self.assertGreater(record['cache_hits'], 0)
+
+    @override_settings(PERFORMANCE_SAMPLE_RATE=0)
+    def test_not_sampled(self):
+        response = Client().get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
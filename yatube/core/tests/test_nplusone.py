@@ -0,0 +1,47 @@
+from django.contrib.auth import get_user_model
+from django.template import Context, Template
+from django.test import TestCase
+
+from core import nplusone
+from posts.models import Post
+
+User = get_user_model()
+
+
+class QueryShapeTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        for number in range(5):
+            author = User.objects.create(username=f'author{number}')
+            Post.objects.create(text=f'Пост {number}', author=author)
+
+    def test_normalize(self):
+        self.assertEqual(
+            nplusone.normalize(
+                "SELECT * FROM t WHERE id IN (%s, %s,%s) AND a = 'x''y'"
+                "\n LIMIT 21"
+            ),
+            'SELECT * FROM t WHERE id IN (...) AND a = ? LIMIT ?',
+        )
+
+    def test_reports_template_line(self):
+        template = Template(
+            '{% for post in posts %}\n{{ post.author.username }}{% endfor %}'
+        )
+        with nplusone.detect() as shapes:
+            template.render(Context({'posts': Post.objects.all()}))
+        repeated = shapes.repeated(threshold=3)
+        self.assertEqual(len(repeated), 1)
+        shape, count, origin = repeated[0]
+        self.assertIn('auth_user', shape)
+        self.assertEqual(count, 5)
+        self.assertTrue(origin.endswith(':2'), origin)
+
+    def test_assertion_fails_on_repeats(self):
+        mixin = nplusone.NPlusOneAssertionsMixin()
+        mixin.fail = self.fail
+        with self.assertRaisesRegex(AssertionError, r'5 x .*auth_user'):
+            with mixin.assertNoRepeatedQueries(threshold=3):
+                for post in Post.objects.all():
+                    post.author.username
@@ -0,0 +1,53 @@
+from django.core.paginator import Paginator
+from django.template import Context, Template
+from django.test import RequestFactory, SimpleTestCase
+
+from core import holes
+from core.templatetags.user_filters import page_window
+
+
+class PageWindowTests(SimpleTestCase):
+    def window(self, num_pages, number, size=2):
+        return page_window(Paginator(range(num_pages), 1).page(number), size)
+
+    def test_few_pages(self):
+        self.assertEqual(self.window(3, 2), [1, 2, 3])
+
+    def test_middle_page(self):
+        self.assertEqual(
+            self.window(100000, 500),
+            [1, None, 498, 499, 500, 501, 502, None, 100000],
+        )
+
+    def test_edges(self):
+        self.assertEqual(self.window(10, 1), [1, 2, 3, None, 10])
+        self.assertEqual(self.window(10, 10), [1, None, 8, 9, 10])
+        self.assertEqual(self.window(10, 4), [1, 2, 3, 4, 5, 6, None, 10])
+
+
+class HoleTagTests(SimpleTestCase):
+    template = Template(
+        "{% load holes %}<p>{% hole 'posts/includes/edit_button.html' "
+        "username=name %}</p>"
+    )
+
+    def render(self, skeleton):
+        request = RequestFactory().get('/')
+        request.render_skeleton = skeleton
+        return request, self.template.render(
+            Context({'request': request, 'name': 'author'})
+        )
+
+    def test_inline_without_skeleton(self):
+        _, content = self.render(False)
+        self.assertNotIn('<!--hole:', content)
+
+    def test_skeleton_filled_per_request(self):
+        request, content = self.render(True)
+        self.assertRegex(content, r'^<p><!--hole:[\w-]+--></p>$')
+
+        class User:
+            username = 'author'
+
+        filled = holes.fill(request, content, {'user': User()})
+        self.assertIn('Редактировать запись', filled)
@@ -1,7 +1,12 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class PostsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'posts'
     verbose_name = 'Посты'
+
+    def ready(self):
+        from . import search, signals  # noqa: F401
+        post_migrate.connect(search.ensure_index, sender=self)
@@ -0,0 +1,72 @@
+"""Массовая загрузка данных в обход сигналов.
+
+bulk_create не вызывает сигналы posts.signals, поэтому после загрузки
+производные данные (счётчики, ленты, кэши) пересобираются целиком.
+"""
+from contextlib import contextmanager
+from itertools import islice
+
+from django.core.management.color import no_style
+from django.db import connection, transaction
+
+from . import cache, counts, stats, timeline
+
+BATCH_SIZE = 2000
+
+
+@contextmanager
+def preserve_auto_now_add(*models):
+    """Не даёт auto_now_add затереть переданные даты при сохранении."""
+    fields = [
+        field
+        for model in models
+        for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now_add', False)
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def chunks(iterable, size):
+    """Делит iterable (в том числе генератор) на списки по size штук."""
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, size))
+
+
+def insert(model, objects, batch_size=BATCH_SIZE, **kwargs):
+    """bulk_create по пачкам; objects может быть генератором.
+
+    Размер одного INSERT выбирает Django: в 2.2 явный batch_size
+    не ограничивается лимитами SQLite на число параметров.
+    """
+    total = 0
+    for batch in chunks(objects, batch_size):
+        with transaction.atomic():
+            model.objects.bulk_create(batch, **kwargs)
+        total += len(batch)
+    return total
+
+
+def reset_sequences(*models):
+    """Сдвигает счётчики первичных ключей после вставки с явными id."""
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def rebuild_derived_data():
+    stats.repair_authors()
+    stats.repair_groups()
+    stats.repair_posts()
+    timeline.rebuild()
+    counts.reconcile()
+    cache.bump_generations(cache.FEED_SCOPE, cache.USERS_SCOPE)
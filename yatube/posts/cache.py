@@ -0,0 +1,237 @@
+import hashlib
+import logging
+import math
+import random
+import time
+from functools import wraps
+from urllib.parse import quote
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.http import HttpResponse
+from django.utils.http import quote_etag
+
+from core import holes
+
+logger = logging.getLogger(__name__)
+
+FEED_SCOPE = 'feed'
+USERS_SCOPE = 'users'
+# Любой комментарий: от него зависит comments_count в лентах API.
+COMMENTS_SCOPE = 'comments'
+
+
+def group_scope(slug):
+    return f'group:{slug}'
+
+
+def author_scope(username):
+    return f'author:{username}'
+
+
+def post_scope(post_id):
+    return f'post:{post_id}'
+
+
+def follower_scope(user_id):
+    return f'follower:{user_id}'
+
+
+def generation_key(scope):
+    return f'generation:{quote(scope)}'
+
+
+def _initial_generation():
+    # После вытеснения ключа счётчик не должен вернуться к старым значениям.
+    return int(time.time() * 1000)
+
+
+def get_generations(scopes):
+    """Поколения областей; у области без ключа - 0.
+
+    Ключ создаёт только bump_generations, поэтому чтение, в том числе
+    по несуществующим slug и username, ничего не пишет в кэш.
+    """
+    keys = [generation_key(scope) for scope in scopes]
+    generations = cache.get_many(keys)
+    return [generations.get(key, 0) for key in keys]
+
+
+def bump_generations(*scopes):
+    for scope in scopes:
+        key = generation_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial_generation(), None)
+
+
+def post_generation_scopes(post, group=None):
+    scopes = [
+        FEED_SCOPE, author_scope(post.author.username), post_scope(post.pk)
+    ]
+    group = post.group if group is None else group
+    if group is not None:
+        scopes.append(group_scope(group.slug))
+    return scopes
+
+
+def page_key(view_name, path):
+    path_hash = hashlib.md5(path.encode()).hexdigest()
+    return f'page:{view_name}:{path_hash}'
+
+
+def once_per_request(scopes):
+    """Области страницы спрашивают и ETag, и кэш каркаса - считаем один раз."""
+    @wraps(scopes)
+    def wrapper(request, *args, **kwargs):
+        memo = request.__dict__.setdefault('_page_scopes', {})
+        key = (scopes, args, tuple(sorted(kwargs.items())))
+        if key not in memo:
+            memo[key] = scopes(request, *args, **kwargs)
+        return memo[key]
+    return wrapper
+
+
+def page_etag(scopes):
+    """etag_func для condition(): ответ 304 без запроса страницы к базе.
+
+    Тег складывается из поколений областей страницы и пользователя, для
+    которого дорисованы личные части. CSRF-cookie в тег не входит: первый
+    ответ её только устанавливает, а меняется она при входе, вместе
+    с пользователем.
+    """
+    def etag(request, *args, **kwargs):
+        try:
+            scope_names = scopes(request, *args, **kwargs)
+        except DatabaseError:
+            return None
+        if scope_names is None:
+            return None
+        return etag_for(request, get_generations(scope_names))
+    return etag
+
+
+def etag_for(request, generations):
+    parts = [request.get_full_path(), request.user.pk, *generations]
+    raw = '\n'.join(str(part) for part in parts)
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def needs_refresh(entry, generations, now):
+    if entry is None or entry['generations'] != generations:
+        return True
+    # XFetch: чем дольше пересборка и ближе срок, тем вероятнее пересобрать
+    # каркас заранее, пока остальные запросы получают действующую копию.
+    early = -entry['delta'] * settings.FEED_CACHE_EARLY_REFRESH * math.log(
+        1 - random.random()
+    )
+    return now + early >= entry['expires']
+
+
+def fill_page(request, response, skeleton, fill_context, args, kwargs):
+    try:
+        context = {}
+        if fill_context is not None:
+            context = fill_context(request, *args, **kwargs)
+        response.content = holes.fill(request, skeleton, context)
+    except DatabaseError:
+        # База недоступна: личные части страницы - как для гостя.
+        request.user = AnonymousUser()
+        response.content = holes.fill(request, skeleton, {})
+    return response
+
+
+def render_skeleton(view, key, generations, request, args, kwargs):
+    now = time.time()
+    request.render_skeleton = True
+    try:
+        response = view(request, *args, **kwargs)
+    finally:
+        request.render_skeleton = False
+    if response.status_code != 200:
+        return response, None
+    skeleton = response.content.decode(response.charset)
+    cache.set(key, {
+        'generations': generations,
+        'skeleton': skeleton,
+        'delta': time.time() - now,
+        'expires': now + settings.FEED_CACHE_TIMEOUT,
+    }, settings.FEED_CACHE_TIMEOUT + settings.FEED_CACHE_GRACE)
+    return response, skeleton
+
+
+def build_page(view, key, entry, scope_names, request, args, kwargs):
+    """Ответ, каркас страницы и поколения каркаса, если он устарел.
+
+    Пересобирает каркас один запрос - тот, что взял блокировку; остальные
+    в это время получают прежнюю копию. Каркаса нет (None), если ответ
+    не кэшируется.
+    """
+    generations = get_generations(scope_names)
+    if not needs_refresh(entry, generations, time.time()):
+        return HttpResponse(), entry['skeleton'], None
+    lock = f'lock:{key}'
+    locked = cache.add(lock, True, settings.FEED_CACHE_LOCK_TIMEOUT)
+    if not locked and entry is not None:
+        stale = entry['generations']
+        if stale == generations:
+            stale = None
+        return HttpResponse(), entry['skeleton'], stale
+    try:
+        response, skeleton = render_skeleton(
+            view, key, generations, request, args, kwargs
+        )
+        return response, skeleton, None
+    finally:
+        if locked:
+            cache.delete(lock)
+
+
+def cache_feed(scopes, fill_context=None):
+    """Кэширует общий для всех пользователей каркас страницы.
+
+    scopes(request, *args, **kwargs) возвращает имена областей; любое
+    изменение поста, группы или автора увеличивает поколение области,
+    и каркас пересобирается при следующем запросе. Персональные части
+    страницы (тег hole) дорисовываются на каждый запрос, контекст для
+    них возвращает fill_context(request, *args, **kwargs).
+
+    Пока база недоступна, отдаётся прежний каркас, но не дольше
+    FEED_CACHE_TIMEOUT + FEED_CACHE_GRACE. ETag устаревшего каркаса
+    считается по его поколениям: иначе прежняя копия получила бы тег
+    новой, и клиент получал бы на неё 304 и после пересборки.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            key = page_key(view.__name__, request.get_full_path())
+            entry = cache.get(key)
+            try:
+                scope_names = scopes(request, *args, **kwargs)
+                if scope_names is None:
+                    return view(request, *args, **kwargs)
+                response, skeleton, stale = build_page(
+                    view, key, entry, scope_names, request, args, kwargs
+                )
+            except DatabaseError:
+                if entry is None:
+                    raise
+                logger.warning('База недоступна, отдан прежний каркас %s', key)
+                response, skeleton = HttpResponse(), entry['skeleton']
+                stale = entry['generations']
+            if skeleton is None:
+                return response
+            response = fill_page(
+                request, response, skeleton, fill_context, args, kwargs
+            )
+            if stale is not None:
+                # condition() не заменяет уже выставленный тег.
+                response['ETag'] = quote_etag(etag_for(request, stale))
+            return response
+        return wrapper
+    return decorator
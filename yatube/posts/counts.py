@@ -0,0 +1,89 @@
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from .models import Follow, Group, Post
+
+GLOBAL_SCOPE = 'all'
+
+
+def group_scope(group_id):
+    return f'group:{group_id}'
+
+
+def author_scope(author_id):
+    return f'author:{author_id}'
+
+
+def follow_scope(user_id):
+    return f'follow:{user_id}'
+
+
+def count_key(scope):
+    return f'post_count:{scope}'
+
+
+def timeout(scope):
+    # Ленты подписок не правятся при публикации (иначе запись на каждого
+    # подписчика автора) и пересчитываются после короткого срока.
+    if scope.startswith(follow_scope('')):
+        return settings.FOLLOW_COUNT_CACHE_TIMEOUT
+    return settings.POST_COUNT_CACHE_TIMEOUT
+
+
+def post_scopes(post, group_id=None):
+    group_id = post.group_id if group_id is None else group_id
+    scopes = [GLOBAL_SCOPE, author_scope(post.author_id)]
+    if group_id:
+        scopes.append(group_scope(group_id))
+    return scopes
+
+
+def adjust(scopes, delta):
+    # Отсутствующий ключ не заводим: промах кэша даст точный COUNT(*).
+    for scope in scopes:
+        try:
+            cache.incr(count_key(scope), delta)
+        except ValueError:
+            pass
+
+
+def invalidate(*scopes):
+    cache.delete_many([count_key(scope) for scope in scopes])
+
+
+def store(counts):
+    by_timeout = {}
+    for scope, value in counts.items():
+        by_timeout.setdefault(timeout(scope), {})[count_key(scope)] = value
+    for seconds, values in by_timeout.items():
+        cache.set_many(values, seconds)
+
+
+def reconcile():
+    """Пересчитывает точные числа постов и записывает их в кэш."""
+    exact = {GLOBAL_SCOPE: Post.objects.count()}
+    for group_id in Group.objects.values_list('id', flat=True):
+        exact[group_scope(group_id)] = 0
+    by_group = Post.objects.exclude(group=None).values_list(
+        'group'
+    ).annotate(total=Count('id')).order_by()
+    for group_id, total in by_group:
+        exact[group_scope(group_id)] = total
+    by_author = dict(
+        Post.objects.values_list('author').annotate(
+            total=Count('id')
+        ).order_by()
+    )
+    for author_id, total in by_author.items():
+        exact[author_scope(author_id)] = total
+    by_follower = Counter()
+    follows = Follow.objects.values_list('user', 'author').iterator()
+    for user_id, author_id in follows:
+        by_follower[user_id] += by_author.get(author_id, 0)
+    for user_id, total in by_follower.items():
+        exact[follow_scope(user_id)] = total
+    store(exact)
+    return exact
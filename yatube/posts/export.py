@@ -0,0 +1,123 @@
+"""Потоковая выгрузка постов, комментариев и подписок в NDJSON или CSV.
+
+Строки читаются через values_list().iterator(chunk_size), поэтому память
+не зависит от размера таблицы. Повторная выгрузка может забрать только
+новые записи: новее даты (since) или с id больше after_id.
+
+CSV рассчитан на просмотр в табличных редакторах, поэтому текст,
+начинающийся с =, +, - или @, выгружается с апострофом впереди, чтобы
+редактор не принял его за формулу. Точную копию данных даёт NDJSON.
+"""
+import csv
+from datetime import datetime
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import bulk
+from .models import Comment, Follow, Post
+
+CHUNK_SIZE = 2000
+
+# Таблица -> модель, поле даты для since, выгружаемые столбцы.
+TABLES = {
+    'posts': (Post, 'pub_date', (
+        'id', 'pub_date', 'author_id', 'group_id', 'text', 'image',
+        'comments_count',
+    )),
+    'comments': (Comment, 'created', (
+        'id', 'created', 'post_id', 'author_id', 'text',
+    )),
+    'follows': (Follow, None, ('id', 'user_id', 'author_id')),
+}
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+class ExportError(ValueError):
+    pass
+
+
+def parse_since(value):
+    try:
+        since = parse_datetime(value)
+    except ValueError:
+        since = None
+    if since is None:
+        raise ExportError(f'Неверная дата {value!r}, нужен ISO 8601')
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return since
+
+
+def rows(table, since=None, after_id=None, chunk_size=CHUNK_SIZE):
+    if table not in TABLES:
+        raise ExportError(
+            f'Неизвестная таблица {table!r}; доступны: {", ".join(TABLES)}'
+        )
+    model, date_field, fields = TABLES[table]
+    queryset = model.objects.all()
+    if since is not None:
+        if date_field is None:
+            raise ExportError(f'У таблицы {table} нет даты, нужен after_id')
+        queryset = queryset.filter(**{f'{date_field}__gt': since})
+    if after_id is not None:
+        queryset = queryset.filter(pk__gt=after_id)
+    return queryset.order_by('pk').values_list(*fields).iterator(
+        chunk_size=chunk_size
+    )
+
+
+def ndjson_lines(fields, rows):
+    encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    for row in rows:
+        yield encoder.encode(dict(zip(fields, row))) + '\n'
+
+
+class _Echo:
+    """Файл для csv.writer, который возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def csv_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def csv_lines(fields, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow([csv_value(value) for value in row])
+
+
+ENCODERS = {'ndjson': ndjson_lines, 'csv': csv_lines}
+
+
+def _blocks(lines, size):
+    # Пачка строк на запись: не по системному вызову на каждую строку.
+    for chunk in bulk.chunks(lines, size):
+        yield ''.join(chunk)
+
+
+def stream(table, format='ndjson', since=None, after_id=None,
+           chunk_size=CHUNK_SIZE):
+    """Итератор текстовых блоков выгрузки; ошибки в аргументах - сразу."""
+    if format not in FORMATS:
+        raise ExportError(
+            f'Неизвестный формат {format!r}; доступны: {", ".join(FORMATS)}'
+        )
+    source = rows(table, since, after_id, chunk_size)
+    fields = TABLES[table][2]
+    return _blocks(ENCODERS[format](fields, source), chunk_size)
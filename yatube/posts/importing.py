@@ -0,0 +1,224 @@
+"""Импорт чужого контента пачками bulk_create.
+
+Источник ссылается на авторов по username, на группы по slug, а на
+посты - по собственным id. Соответствия держатся в словарях в памяти:
+пользователи и группы, которых ещё нет, создаются по ходу, а постам
+id назначаются заранее, чтобы комментарии нашли их без запросов.
+Строки, которые не удалось привязать, пропускаются и считаются.
+bulk_create не вызывает сигналы, поэтому затронутые области кэша
+копятся в scopes, и их поколения нужно увеличить после загрузки.
+Импорт рассчитан на остановленный сайт: id постов берутся подряд
+после наибольшего в базе.
+"""
+import csv
+import json
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import bulk, cache
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+TABLES = ('users', 'groups', 'posts', 'comments', 'follows')
+
+
+class SourceError(ValueError):
+    pass
+
+
+def read_rows(source, format):
+    """Словари строк из открытого текстового файла NDJSON или CSV."""
+    if format == 'csv':
+        yield from csv.DictReader(source)
+        return
+    for number, line in enumerate(source, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            raise SourceError(f'Строка {number}: не JSON')
+        if not isinstance(row, dict):
+            raise SourceError(f'Строка {number}: нужен объект JSON')
+        yield row
+
+
+def parse_date(value):
+    if not value:
+        return timezone.now()
+    date = parse_datetime(value)
+    if date is None:
+        raise SourceError(f'Неверная дата {value!r}')
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date)
+    return date
+
+
+class Importer:
+    def __init__(self, batch_size):
+        self.batch_size = batch_size
+        self.users = dict(
+            User.objects.values_list('username', 'id').iterator()
+        )
+        self.groups = dict(Group.objects.values_list('slug', 'id').iterator())
+        self.posts = {}
+        last_post = Post.objects.aggregate(last=Max('pk'))['last'] or 0
+        self.next_post_id = last_post + 1
+        self.skipped = Counter()
+        self.scopes = set()
+
+    def run(self, table, rows):
+        """Загружает строки таблицы; возвращает число добавленных строк."""
+        load = getattr(self, f'load_{table}')
+        inserted = 0
+        for batch in bulk.chunks(rows, self.batch_size):
+            with transaction.atomic():
+                inserted += load(batch)
+        return inserted
+
+    def create_users(self, users):
+        users = {
+            user.username: user
+            for user in users if user.username not in self.users
+        }
+        if not users:
+            return 0
+        User.objects.bulk_create(users.values(), ignore_conflicts=True)
+        self.scopes.update(cache.author_scope(name) for name in users)
+        self.users.update(User.objects.filter(
+            username__in=list(users)
+        ).values_list('username', 'id'))
+        return len(users)
+
+    def resolve_users(self, names):
+        return self.create_users(
+            User(username=name, password='!')
+            for name in set(names) if name
+        )
+
+    def create_groups(self, groups):
+        groups = {
+            group.slug: group
+            for group in groups if group.slug not in self.groups
+        }
+        if not groups:
+            return 0
+        Group.objects.bulk_create(groups.values(), ignore_conflicts=True)
+        self.scopes.update(cache.group_scope(slug) for slug in groups)
+        self.groups.update(Group.objects.filter(
+            slug__in=list(groups)
+        ).values_list('slug', 'id'))
+        return len(groups)
+
+    def valid(self, table, batch, key):
+        rows = [row for row in batch if row.get(key)]
+        self.skipped[table] += len(batch) - len(rows)
+        return rows
+
+    def load_users(self, batch):
+        return self.create_users(
+            User(
+                username=row['username'],
+                first_name=row.get('first_name') or '',
+                last_name=row.get('last_name') or '',
+                email=row.get('email') or '',
+                date_joined=parse_date(row.get('date_joined')),
+                password='!',
+            )
+            for row in self.valid('users', batch, 'username')
+        )
+
+    def load_groups(self, batch):
+        return self.create_groups(
+            Group(
+                slug=row['slug'],
+                title=row.get('title') or row['slug'],
+                description=row.get('description') or '',
+            )
+            for row in self.valid('groups', batch, 'slug')
+        )
+
+    def load_posts(self, batch):
+        self.resolve_users(row.get('author') for row in batch)
+        self.create_groups(
+            Group(slug=slug, title=slug, description='')
+            for slug in {row.get('group') for row in batch} if slug
+        )
+        posts = []
+        for row in batch:
+            author_id = self.users.get(row.get('author'))
+            if author_id is None:
+                self.skipped['posts'] += 1
+                continue
+            post = Post(
+                id=self.next_post_id,
+                text=row.get('text') or '',
+                pub_date=parse_date(row.get('pub_date')),
+                author_id=author_id,
+                group_id=self.groups.get(row.get('group')),
+                image=row.get('image') or None,
+            )
+            self.next_post_id += 1
+            self.scopes.add(cache.author_scope(row['author']))
+            if post.group_id is not None:
+                self.scopes.add(cache.group_scope(row['group']))
+            if row.get('id') not in (None, ''):
+                self.posts[str(row['id'])] = post.pk
+            posts.append(post)
+        Post.objects.bulk_create(posts)
+        return len(posts)
+
+    def load_comments(self, batch):
+        self.resolve_users(row.get('author') for row in batch)
+        comments = []
+        for row in batch:
+            author_id = self.users.get(row.get('author'))
+            post_id = self.posts.get(str(row.get('post')))
+            if author_id is None or post_id is None:
+                self.skipped['comments'] += 1
+                continue
+            comments.append(Comment(
+                text=row.get('text') or '',
+                created=parse_date(row.get('created')),
+                author_id=author_id,
+                post_id=post_id,
+            ))
+        Comment.objects.bulk_create(comments)
+        if comments:
+            self.scopes.add(cache.COMMENTS_SCOPE)
+        return len(comments)
+
+    def load_follows(self, batch):
+        self.resolve_users(
+            name
+            for row in batch
+            for name in (row.get('user'), row.get('author'))
+        )
+        pairs = set()
+        for row in batch:
+            user_id = self.users.get(row.get('user'))
+            author_id = self.users.get(row.get('author'))
+            if user_id is None or author_id is None or user_id == author_id:
+                continue
+            pairs.add((user_id, author_id))
+            self.scopes.add(cache.follower_scope(user_id))
+            self.scopes.add(cache.author_scope(row['author']))
+        if pairs:
+            pairs -= set(Follow.objects.filter(
+                user__in={user_id for user_id, _ in pairs},
+                author__in={author_id for _, author_id in pairs},
+            ).values_list('user', 'author'))
+        # Повторы и подписки, которые уже есть, считаются пропущенными.
+        self.skipped['follows'] += len(batch) - len(pairs)
+        Follow.objects.bulk_create(
+            (Follow(user_id=user_id, author_id=author_id)
+             for user_id, author_id in pairs),
+            ignore_conflicts=True,
+        )
+        return len(pairs)
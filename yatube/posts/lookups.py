@@ -0,0 +1,112 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import router
+from django.http import Http404
+
+from . import cache
+from .models import Group
+
+User = get_user_model()
+
+_MISSING = object()
+
+
+class LookupCache:
+    """Строки по уникальному полю в памяти процесса, включая промахи.
+
+    Запись живёт не дольше LOOKUP_CACHE_TIMEOUT (промах -
+    LOOKUP_CACHE_MISS_TIMEOUT) и сбрасывается, как только сигналы
+    увеличат поколение области scope(value), в том числе из другого
+    процесса. Каждый вызов get возвращает новый экземпляр модели.
+    Связи один-к-одному из related читаются тем же запросом, как в
+    select_related, и должны менять поколение той же области.
+    """
+
+    def __init__(self, model, field, scope, related=()):
+        self.model = model
+        self.field = field
+        self.scope = scope
+        self.attnames = [f.attname for f in model._meta.concrete_fields]
+        self.related = []
+        self.columns = list(self.attnames)
+        for name in related:
+            relation = model._meta.get_field(name)
+            opts = relation.related_model._meta
+            attnames = [f.attname for f in opts.concrete_fields]
+            pk_index = attnames.index(opts.pk.attname)
+            self.related.append((relation, attnames, pk_index))
+            self.columns += [f'{name}__{attname}' for attname in attnames]
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cached(self, value, generation):
+        with self._lock:
+            entry = self._entries.get(value)
+            if entry is None:
+                return _MISSING
+            row, entry_generation, expires = entry
+            if entry_generation != generation or expires <= time.monotonic():
+                del self._entries[value]
+                return _MISSING
+            self._entries.move_to_end(value)
+            return row
+
+    def _store(self, value, row, generation):
+        timeout = settings.LOOKUP_CACHE_TIMEOUT
+        if row is None:
+            timeout = settings.LOOKUP_CACHE_MISS_TIMEOUT
+        with self._lock:
+            self._entries[value] = (
+                row, generation, time.monotonic() + timeout
+            )
+            self._entries.move_to_end(value)
+            while len(self._entries) > settings.LOOKUP_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+    def get(self, value):
+        generation, = cache.get_generations([self.scope(value)])
+        row = self._cached(value, generation)
+        if row is _MISSING:
+            row = self.model.objects.filter(
+                **{self.field: value}
+            ).values_list(*self.columns).first()
+            self._store(value, row, generation)
+        if row is None:
+            return None
+        db = router.db_for_read(self.model)
+        start = len(self.attnames)
+        instance = self.model.from_db(db, self.attnames, row[:start])
+        for relation, attnames, pk_index in self.related:
+            values = row[start:start + len(attnames)]
+            start += len(attnames)
+            related = None
+            # LEFT JOIN без связанной строки даёт пустые значения.
+            if values[pk_index] is not None:
+                related = relation.related_model.from_db(db, attnames, values)
+                relation.field.set_cached_value(related, instance)
+            relation.set_cached_value(instance, related)
+        return instance
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+groups = LookupCache(Group, 'slug', cache.group_scope)
+# Счётчики автора меняют поколение author_scope вместе с его постами.
+authors = LookupCache(
+    User, 'username', cache.author_scope, related=('stats',)
+)
+
+
+def get_or_404(lookups, value):
+    instance = lookups.get(value)
+    if instance is None:
+        raise Http404(
+            f'{lookups.model._meta.object_name} {value!r} не найден'
+        )
+    return instance
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import export
+
+
+class Command(BaseCommand):
+    help = (
+        'Построчно выгружает посты, комментарии или подписки '
+        'в NDJSON или CSV, не загружая таблицу в память'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('table', choices=list(export.TABLES))
+        parser.add_argument(
+            '--format', choices=list(export.FORMATS), default='ndjson',
+        )
+        parser.add_argument(
+            '--since', help='только записи новее даты в ISO 8601',
+        )
+        parser.add_argument(
+            '--after-id', type=int, help='только записи с большим id',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=export.CHUNK_SIZE,
+        )
+        parser.add_argument(
+            '-o', '--output', help='файл; по умолчанию - stdout',
+        )
+
+    def handle(self, *args, **options):
+        since = options['since']
+        try:
+            if since is not None:
+                since = export.parse_since(since)
+            blocks = export.stream(
+                options['table'],
+                options['format'],
+                since=since,
+                after_id=options['after_id'],
+                chunk_size=options['chunk_size'],
+            )
+        except export.ExportError as error:
+            raise CommandError(error)
+        if options['output'] is None:
+            for block in blocks:
+                self.stdout.write(block, ending='')
+            return
+        with open(
+            options['output'], 'w', encoding='utf-8', newline=''
+        ) as output:
+            for block in blocks:
+                output.write(block)
@@ -0,0 +1,51 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Создаёт миниатюры для уже загруженных картинок постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.THUMBNAIL_WORKERS,
+            help='число параллельных потоков; 1 - без пула',
+        )
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        names = Post.objects.exclude(image='').values_list(
+            'image', flat=True
+        ).distinct().order_by()
+        done = failed = 0
+        if workers <= 1:
+            for name in names.iterator():
+                if thumbnails.create(name):
+                    done += 1
+                else:
+                    failed += 1
+            self.stdout.write(f'Готово: {done}, с ошибкой: {failed}')
+            return
+        pending = set()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for name in names.iterator():
+                if len(pending) >= workers * thumbnails.QUEUE_PER_WORKER:
+                    finished, pending = wait(
+                        pending, return_when=FIRST_COMPLETED
+                    )
+                    for future in finished:
+                        done, failed = self.tally(future, done, failed)
+                pending.add(executor.submit(thumbnails.generate, name))
+            for future in wait(pending).done:
+                done, failed = self.tally(future, done, failed)
+        self.stdout.write(f'Готово: {done}, с ошибкой: {failed}')
+
+    @staticmethod
+    def tally(future, done, failed):
+        if future.result():
+            return done + 1, failed
+        return done, failed + 1
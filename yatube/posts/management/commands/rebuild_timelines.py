@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+
+
+class Command(BaseCommand):
+    help = 'Заново заполняет ленты подписок по текущим подпискам'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, nargs='+', dest='user_ids',
+            help='id пользователей; по умолчанию - все',
+        )
+
+    def handle(self, *args, **options):
+        timeline.rebuild(options['user_ids'])
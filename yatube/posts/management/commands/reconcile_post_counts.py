@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts import counts
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает точные числа постов для пагинаторов и записывает '
+        'их в кэш. Запускается периодически, например из cron.'
+    )
+
+    def handle(self, *args, **options):
+        exact = counts.reconcile()
+        self.stdout.write(f'Сверено счётчиков: {len(exact)}')
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from posts import stats
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает денормализованные счётчики: статистику авторов, '
+        'число постов в группах и комментариев к постам'
+    )
+
+    def handle(self, *args, **options):
+        authors = stats.repair_authors()
+        groups = stats.repair_groups()
+        posts = stats.repair_posts()
+        self.stdout.write(
+            f'Авторов: {authors}, групп: {groups}, постов: {posts}'
+        )
@@ -0,0 +1,213 @@
+import os
+import random
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import timedelta
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max
+from django.utils import timezone
+from PIL import Image
+
+from posts import bulk, seeding
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+IMAGE_VARIANTS = 8
+
+
+class InlineExecutor:
+    """Заменяет пул процессов при --workers 0."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+
+def bounded_map(executor, fn, tasks, window):
+    """Результаты fn по порядку, не больше window задач одновременно."""
+    pending = deque()
+    for args in tasks:
+        if len(pending) >= window:
+            yield pending.popleft().result()
+        pending.append(executor.submit(fn, *args))
+    while pending:
+        yield pending.popleft().result()
+
+
+def next_id(model):
+    return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, группами, постами, '
+        'комментариями и подписками'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument(
+            '--follows', type=float, default=20,
+            help='среднее число подписок на пользователя',
+        )
+        parser.add_argument(
+            '--images', type=float, default=0,
+            help='доля постов с картинкой, от 0 до 1',
+        )
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='процессы для генерации строк; 0 - без пула',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=bulk.BATCH_SIZE,
+        )
+
+    def handle(self, *args, **options):
+        if not options['users'] and (
+            options['posts'] or options['comments'] or options['follows']
+        ):
+            raise CommandError('Нужен хотя бы один пользователь (--users)')
+        self.options = options
+        self.seed = options['seed']
+        now = timezone.now()
+        self.period = (
+            (now - timedelta(days=options['days'])).timestamp(),
+            now.timestamp(),
+        )
+        workers = options['workers']
+        executor = (
+            ProcessPoolExecutor(max_workers=workers) if workers > 0
+            else InlineExecutor()
+        )
+        self.window = max(workers, 1) * 2
+        with executor, bulk.preserve_auto_now_add(Post, Comment):
+            self.executor = executor
+            self.seed_all()
+        self.stdout.write('Пересчёт счётчиков и лент...')
+        bulk.rebuild_derived_data()
+        self.stdout.write(self.style.SUCCESS('Готово'))
+
+    def seed_all(self):
+        options = self.options
+        users = (next_id(User), options['users'])
+        self.load(User, seeding.users, users, self.build_user, *self.period)
+        groups = (next_id(Group), options['groups'])
+        self.load_groups(groups)
+        posts = (next_id(Post), options['posts'])
+        self.load(
+            Post, seeding.posts, posts, self.build_post,
+            users, groups, self.make_images(), options['images'],
+            *self.period,
+        )
+        if posts[1]:
+            self.load(
+                Comment, seeding.comments,
+                (next_id(Comment), options['comments']), self.build_comment,
+                users, posts, *self.period,
+            )
+        self.load(
+            Follow, seeding.follows, users, self.build_follow,
+            users, options['follows'],
+        )
+
+    def load(self, model, generate, ids, build, *args):
+        first_id, total = ids
+        size = self.options['batch_size']
+        tasks = (
+            (self.seed, batch, first_id + offset, min(size, total - offset))
+            + args
+            for batch, offset in enumerate(range(0, total, size))
+        )
+        rows = bounded_map(self.executor, generate, tasks, self.window)
+        inserted = bulk.insert(
+            model, (build(row) for batch in rows for row in batch), size
+        )
+        self.stdout.write(f'{model._meta.verbose_name}: {inserted}')
+
+    def load_groups(self, ids):
+        first_id, total = ids
+        rnd = seeding.batch_random(self.seed, 'groups', 0)
+        inserted = bulk.insert(Group, (
+            Group(
+                id=pk,
+                title=f'Сообщество {pk}',
+                slug=f'seed-{pk}',
+                description=seeding.sentence(rnd, 5, 30),
+            )
+            for pk in range(first_id, first_id + total)
+        ))
+        self.stdout.write(f'{Group._meta.verbose_name}: {inserted}')
+
+    def make_images(self):
+        if not self.options['images']:
+            return []
+        rnd = random.Random(self.seed)
+        names = []
+        for number in range(IMAGE_VARIANTS):
+            name = f'posts/seed_{self.seed}_{number}.jpg'
+            if not default_storage.exists(name):
+                color = tuple(rnd.randrange(256) for _ in range(3))
+                content = BytesIO()
+                Image.new('RGB', (1280, 720), color).save(content, 'JPEG')
+                name = default_storage.save(
+                    name, ContentFile(content.getvalue())
+                )
+            names.append(name)
+        return names
+
+    @staticmethod
+    def build_user(row):
+        pk, username, first_name, last_name, date_joined = row
+        return User(
+            id=pk,
+            username=username,
+            first_name=first_name,
+            last_name=last_name,
+            date_joined=date_joined,
+            password='!',
+        )
+
+    @staticmethod
+    def build_post(row):
+        pk, text, pub_date, author_id, group_id, image = row
+        return Post(
+            id=pk,
+            text=text,
+            pub_date=pub_date,
+            author_id=author_id,
+            group_id=group_id,
+            image=image,
+        )
+
+    @staticmethod
+    def build_comment(row):
+        pk, text, created, author_id, post_id = row
+        return Comment(
+            id=pk,
+            text=text,
+            created=created,
+            author_id=author_id,
+            post_id=post_id,
+        )
+
+    @staticmethod
+    def build_follow(row):
+        user_id, author_id = row
+        return Follow(user_id=user_id, author_id=author_id)
@@ -11,6 +11,7 @@ class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
     description = models.TextField()
+    posts_count = models.PositiveIntegerField('Число постов', default=0)
 
     def __str__(self):
         return f'{self.title}'
@@ -20,6 +21,20 @@ class Post(models.Model):
     class Meta:
         verbose_name = 'Посты'
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='posts_post_author_date_idx',
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='posts_post_group_date_idx',
+            ),
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='posts_post_date_id_idx',
+            ),
+        ]
     text = models.TextField(
         'Текст поста',
         help_text='Введите текст поста'
@@ -50,6 +65,16 @@ class Post(models.Model):
         help_text=('Группа, к которой будет '
                    'относиться пост')
     )
+    comments_count = models.PositiveIntegerField(
+        'Число комментариев',
+        default=0
+    )
+    version = models.PositiveIntegerField(
+        'Версия',
+        default=0,
+        editable=False,
+        help_text='Растёт при каждом изменении; входит в ключ кэша'
+    )
 
     def __str__(self):
         return self.text[:15]
@@ -59,6 +84,12 @@ class Comment(models.Model):
     class Meta:
         verbose_name = 'Комменты'
         ordering = ['-created']
+        indexes = [
+            models.Index(
+                fields=['post', '-created', '-id'],
+                name='posts_comment_post_date_idx',
+            ),
+        ]
     text = models.TextField(
         'Текст комментария',
         help_text='Введите текст комментария',
@@ -88,6 +119,12 @@ class Follow(models.Model):
     class Meta:
         verbose_name = 'Подписки'
         unique_together = ('user', 'author',)
+        indexes = [
+            models.Index(
+                fields=['author', 'user'],
+                name='posts_follow_author_user_idx',
+            ),
+        ]
 
     user = models.ForeignKey(
         User,
@@ -104,3 +141,55 @@ class Follow(models.Model):
 
     def __str__(self):
         return f"Фоловер: {self.user}; Автор: {self.author}."
+
+
+class AuthorStats(models.Model):
+    class Meta:
+        verbose_name = 'Статистика автора'
+
+    user = models.OneToOneField(
+        User,
+        verbose_name='Пользователь',
+        related_name='stats',
+        primary_key=True,
+        on_delete=models.CASCADE
+    )
+    posts_count = models.PositiveIntegerField('Число постов', default=0)
+    followers_count = models.PositiveIntegerField(
+        'Число подписчиков',
+        default=0
+    )
+    following_count = models.PositiveIntegerField('Число подписок', default=0)
+
+    def __str__(self):
+        return f'Статистика {self.user}'
+
+
+class TimelineEntry(models.Model):
+    class Meta:
+        verbose_name = 'Лента подписок'
+        ordering = ['-pub_date', '-post_id']
+        unique_together = ('user', 'post',)
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='posts_timeline_user_date_idx',
+            ),
+        ]
+
+    user = models.ForeignKey(
+        User,
+        verbose_name='Подписчик',
+        related_name='timeline',
+        on_delete=models.CASCADE
+    )
+    post = models.ForeignKey(
+        Post,
+        verbose_name='Пост',
+        related_name='timeline_entries',
+        on_delete=models.CASCADE
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    def __str__(self):
+        return f'Лента {self.user}: {self.post}'
@@ -0,0 +1,172 @@
+import base64
+import binascii
+import json
+from collections.abc import Sequence
+from datetime import datetime
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from . import counts
+
+
+def encode_token(values):
+    """Упаковывает значения курсора в непрозрачный URL-безопасный токен."""
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_token(token):
+    """Распаковывает токен encode_token; None, если токен повреждён."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw.decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    return values if isinstance(values, list) else None
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator, берущий общее число записей из кэша.
+
+    Счётчики поддерживаются сигналами posts.signals и сверяются
+    командой reconcile_post_counts; при промахе считается COUNT(*).
+    """
+
+    def __init__(self, object_list, per_page, count_scope=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_scope = count_scope
+
+    @cached_property
+    def count(self):
+        if self.count_scope is None:
+            return super().count
+        key = counts.count_key(self.count_scope)
+        count = cache.get(key)
+        if count is None:
+            count = super().count
+            cache.add(key, count, counts.timeout(self.count_scope))
+        return count
+
+    def page(self, number):
+        # Приблизительный count не должен обрезать страницу, поэтому
+        # последняя страница забирает orphans сверх per_page, а не до count.
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page
+        if top + self.orphans >= self.count:
+            top += self.orphans
+        return self._get_page(self.object_list[bottom:top], number, self)
+
+
+class CursorPage(Sequence):
+    is_cursor = True
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self)}>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Постраничная выдача по ключу сортировки вместо OFFSET.
+
+    Курсор - непрозрачный токен со значениями полей сортировки
+    крайней записи страницы, поэтому стоимость запроса не зависит
+    от глубины страницы.
+    """
+
+    def __init__(self, object_list, per_page, ordering=('-pub_date', '-id')):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.fields = [name.lstrip('-') for name in self.ordering]
+
+    def encode_cursor(self, obj):
+        values = []
+        for name in self.fields:
+            # Строки values() - словари, остальное - экземпляры моделей.
+            value = obj[name] if isinstance(obj, dict) else getattr(obj, name)
+            if isinstance(value, datetime):
+                value = value.isoformat()
+            values.append(value)
+        return encode_token(values)
+
+    def decode_cursor(self, token):
+        values = decode_token(token)
+        if values is None or len(values) != len(self.fields):
+            return None
+        model = self.object_list.model
+        try:
+            return [
+                model._meta.get_field(name).to_python(value)
+                for name, value in zip(self.fields, values)
+            ]
+        except (ValidationError, TypeError):
+            return None
+
+    def _seek(self, values, reverse=False):
+        condition = Q()
+        for index, name in enumerate(self.ordering):
+            descending = name.startswith('-') != reverse
+            lookup = 'lt' if descending else 'gt'
+            step = Q(**{f'{self.fields[index]}__{lookup}': values[index]})
+            for prev_index in range(index):
+                step &= Q(**{self.fields[prev_index]: values[prev_index]})
+            condition |= step
+        return condition
+
+    def get_page(self, after=None, before=None):
+        after = self.decode_cursor(after) if after else None
+        before = self.decode_cursor(before) if before else None
+        limit = self.per_page + 1
+        if before is not None:
+            ordering = [
+                name[1:] if name.startswith('-') else f'-{name}'
+                for name in self.ordering
+            ]
+            items = list(
+                self.object_list.filter(self._seek(before, reverse=True))
+                .order_by(*ordering)[:limit]
+            )
+            has_previous = len(items) > self.per_page
+            items = items[:self.per_page][::-1]
+            has_next = True
+        else:
+            queryset = self.object_list
+            if after is not None:
+                queryset = queryset.filter(self._seek(after))
+            items = list(queryset.order_by(*self.ordering)[:limit])
+            has_next = len(items) > self.per_page
+            items = items[:self.per_page]
+            has_previous = after is not None
+        if not items:
+            return CursorPage(items)
+        return CursorPage(
+            items,
+            next_cursor=self.encode_cursor(items[-1]) if has_next else None,
+            previous_cursor=(
+                self.encode_cursor(items[0]) if has_previous else None
+            ),
+        )
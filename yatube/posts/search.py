@@ -0,0 +1,173 @@
+"""Полнотекстовый поиск по постам.
+
+Индекс posts_post_fts (FTS5) создаётся миграцией 0016 и обновляется
+триггерами на posts_post. SQLite пересоздаёт таблицу при изменении её
+полей, и триггеры при этом удаляются, поэтому после каждого migrate
+ensure_index создаёт недостающие триггеры и перестраивает индекс.
+"""
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+from django.utils.text import Truncator
+
+from .models import Post
+from .paginators import (
+    CursorPage, CursorPaginator, decode_token, encode_token,
+)
+
+FTS_TABLE = 'posts_post_fts'
+SNIPPET_WORDS = 16
+# Управляющие символы не встречаются в тексте постов и переживают escape.
+MARK_START = '\x02'
+MARK_END = '\x03'
+
+SEARCH_SQL = f"""
+    SELECT id, score, snippet FROM (
+        SELECT
+            rowid AS id,
+            bm25({FTS_TABLE}) AS score,
+            snippet({FTS_TABLE}, 0, %s, %s, '…', %s) AS snippet
+        FROM {FTS_TABLE}
+        WHERE {FTS_TABLE} MATCH %s
+    )
+    WHERE score > %s OR (score = %s AND id > %s)
+    ORDER BY score, id
+    LIMIT %s
+"""
+# Должны совпадать с триггерами миграции 0016.
+TRIGGERS = {
+    f'{FTS_TABLE}_insert': f"""
+        CREATE TRIGGER {FTS_TABLE}_insert AFTER INSERT ON posts_post BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+        END
+    """,
+    f'{FTS_TABLE}_delete': f"""
+        CREATE TRIGGER {FTS_TABLE}_delete AFTER DELETE ON posts_post BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text)
+            VALUES ('delete', old.id, old.text);
+        END
+    """,
+    f'{FTS_TABLE}_update': f"""
+        CREATE TRIGGER {FTS_TABLE}_update AFTER UPDATE OF text ON posts_post
+        BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text)
+            VALUES ('delete', old.id, old.text);
+            INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+        END
+    """,
+}
+MATCH_IDS_SQL = f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s'
+
+
+def is_available():
+    return connection.vendor == 'sqlite'
+
+
+def ensure_index(using=DEFAULT_DB_ALIAS, **kwargs):
+    """Возвращает триггеры индекса, удалённые пересозданием posts_post.
+
+    Подключён к post_migrate; индекс перестраивается, только если
+    чего-то не хватало. Возвращает имена созданных триггеров.
+    """
+    db = connections[using]
+    if db.vendor != 'sqlite':
+        return []
+    with db.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master "
+            "WHERE name = %s OR tbl_name = 'posts_post'",
+            [FTS_TABLE],
+        )
+        existing = {name for name, in cursor.fetchall()}
+        if FTS_TABLE not in existing:
+            return []
+        missing = [name for name in TRIGGERS if name not in existing]
+        for name in missing:
+            cursor.execute(TRIGGERS[name])
+        if missing:
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+            )
+    return missing
+
+
+def match_expression(query):
+    """Запрос пользователя как набор фраз FTS5, без операторов."""
+    return ' '.join(
+        '"{}"'.format(word.replace('"', '""')) for word in query.split()
+    )
+
+
+def highlight(snippet):
+    return mark_safe(
+        escape(snippet)
+        .replace(MARK_START, '<mark>')
+        .replace(MARK_END, '</mark>')
+    )
+
+
+def encode_cursor(score, pk):
+    return encode_token([score, pk])
+
+
+def decode_cursor(token):
+    values = decode_token(token)
+    if values is None or len(values) != 2:
+        return None
+    score, pk = values
+    if not isinstance(score, (int, float)) or not isinstance(pk, int):
+        return None
+    return float(score), pk
+
+
+def filter_posts(queryset, query):
+    """Оставляет в queryset посты, подходящие под запрос."""
+    if not is_available():
+        return queryset.filter(text__icontains=query)
+    match = match_expression(query)
+    if not match:
+        return queryset.none()
+    return queryset.filter(pk__in=RawSQL(MATCH_IDS_SQL, [match]))
+
+
+def find_posts(query, per_page, after=None):
+    """Посты по убыванию релевантности, страница после курсора after.
+
+    У каждого поста есть snippet - фрагмент текста с подсвеченными
+    словами запроса.
+    """
+    queryset = Post.objects.select_related('author', 'group')
+    if not is_available():
+        page = CursorPaginator(
+            queryset.filter(text__icontains=query), per_page
+        ).get_page(after=after)
+        for post in page:
+            post.snippet = escape(Truncator(post.text).words(SNIPPET_WORDS))
+        return page
+    match = match_expression(query)
+    cursor = decode_cursor(after) if after else None
+    score, pk = cursor if cursor is not None else (float('-inf'), 0)
+    if not match:
+        return CursorPage([])
+    with connection.cursor() as db_cursor:
+        db_cursor.execute(SEARCH_SQL, [
+            MARK_START, MARK_END, SNIPPET_WORDS, match,
+            score, score, pk, per_page + 1,
+        ])
+        rows = db_cursor.fetchall()
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+    posts = queryset.in_bulk([row[0] for row in rows])
+    items = []
+    for pk, score, snippet in rows:
+        # Пост мог быть удалён между запросами.
+        if pk in posts:
+            post = posts[pk]
+            post.snippet = highlight(snippet)
+            items.append(post)
+    next_cursor = None
+    if has_next:
+        next_cursor = encode_cursor(rows[-1][1], rows[-1][0])
+    return CursorPage(items, next_cursor=next_cursor)
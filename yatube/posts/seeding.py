@@ -0,0 +1,108 @@
+"""Генераторы синтетических строк для seed_yatube.
+
+Функции работают без Django и выполняются в дочерних процессах: каждая
+возвращает кортежи для одной пачки строк. Генератор случайных чисел
+инициализируется сидом, типом строк и номером пачки, поэтому результат
+не зависит от числа процессов и порядка их выполнения.
+"""
+import random
+from datetime import datetime, timezone
+
+WORDS = (
+    'утро вечер город море лес дорога книга музыка кофе дождь снег '
+    'солнце друг работа проект идея код сервер база запрос ответ '
+    'новость история фото прогулка выходные отпуск поезд река горы '
+    'кино театр ужин завтрак кот собака сад весна лето осень зима'
+).split()
+FIRST_NAMES = ('Анна', 'Иван', 'Мария', 'Пётр', 'Ольга', 'Олег', 'Вера')
+LAST_NAMES = ('Иванов', 'Смирнов', 'Кузнецов', 'Попов', 'Соколов')
+
+
+def batch_random(seed, kind, batch):
+    return random.Random(f'{seed}:{kind}:{batch}')
+
+
+def power_law(rnd, first, count):
+    """Номер из [first, first + count) с вероятностью ~ 1 / ранг.
+
+    Несколько первых авторов получают основную часть подписчиков,
+    как в настоящих соцсетях.
+    """
+    return first + min(int(count ** rnd.random()), count) - 1
+
+
+def sentence(rnd, low, high):
+    return ' '.join(rnd.choices(WORDS, k=rnd.randint(low, high))).capitalize()
+
+
+def timestamp(rnd, start, end):
+    return datetime.fromtimestamp(rnd.uniform(start, end), tz=timezone.utc)
+
+
+def users(seed, batch, first_id, count, start, end):
+    rnd = batch_random(seed, 'users', batch)
+    return [
+        (
+            pk,
+            f'seed{pk}',
+            rnd.choice(FIRST_NAMES),
+            rnd.choice(LAST_NAMES),
+            timestamp(rnd, start, end),
+        )
+        for pk in range(first_id, first_id + count)
+    ]
+
+
+def posts(seed, batch, first_id, count, users, groups, images,
+          image_share, start, end):
+    """users и groups - пары (первый id, количество)."""
+    rnd = batch_random(seed, 'posts', batch)
+    rows = []
+    for pk in range(first_id, first_id + count):
+        group = None
+        if groups[1] and rnd.random() < 0.7:
+            group = groups[0] + rnd.randrange(groups[1])
+        image = ''
+        if images and rnd.random() < image_share:
+            image = rnd.choice(images)
+        rows.append((
+            pk,
+            sentence(rnd, 5, 60),
+            timestamp(rnd, start, end),
+            rnd.randrange(users[0], users[0] + users[1]),
+            group,
+            image,
+        ))
+    return rows
+
+
+def comments(seed, batch, first_id, count, users, posts, start, end):
+    rnd = batch_random(seed, 'comments', batch)
+    return [
+        (
+            pk,
+            sentence(rnd, 2, 20),
+            timestamp(rnd, start, end),
+            rnd.randrange(users[0], users[0] + users[1]),
+            power_law(rnd, *posts),
+        )
+        for pk in range(first_id, first_id + count)
+    ]
+
+
+def follows(seed, batch, first_user, count, users, mean):
+    """Подписки пользователей [first_user, first_user + count)."""
+    rnd = batch_random(seed, 'follows', batch)
+    rows = []
+    for user in range(first_user, first_user + count):
+        wanted = min(int(rnd.expovariate(1 / mean)), users[1] - 1)
+        authors = set()
+        # Популярные авторы выпадают часто, поэтому попыток с запасом.
+        for _ in range(wanted * 4):
+            if len(authors) >= wanted:
+                break
+            author = power_law(rnd, *users)
+            if author != user:
+                authors.add(author)
+        rows.extend((user, author) for author in sorted(authors))
+    return rows
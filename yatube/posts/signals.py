@@ -0,0 +1,203 @@
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import cache, counts, stats, timeline
+from .models import AuthorStats, Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+def only_last_login(update_fields):
+    return update_fields is not None and set(update_fields) == {'last_login'}
+
+
+@receiver(pre_save, sender=User)
+def remember_username(sender, instance, update_fields=None, **kwargs):
+    instance._saved_username = None
+    if only_last_login(update_fields):
+        return
+    if instance.pk is not None and not instance._state.adding:
+        instance._saved_username = User.objects.filter(
+            pk=instance.pk
+        ).values_list('username', flat=True).first()
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        AuthorStats.objects.get_or_create(user=instance)
+    if only_last_login(update_fields):
+        return
+    if not created:
+        # Имя автора входит в закэшированные фрагменты его постов.
+        Post.objects.filter(author=instance).update(version=F('version') + 1)
+    scopes = [
+        cache.FEED_SCOPE,
+        cache.USERS_SCOPE,
+        cache.author_scope(instance.username),
+    ]
+    old_username = getattr(instance, '_saved_username', None)
+    if old_username and old_username != instance.username:
+        scopes.append(cache.author_scope(old_username))
+    cache.bump_generations(*scopes)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    cache.bump_generations(
+        cache.FEED_SCOPE,
+        cache.USERS_SCOPE,
+        cache.author_scope(instance.username),
+    )
+
+
+@receiver(pre_save, sender=Post)
+def remember_group(sender, instance, **kwargs):
+    instance._saved_group_id = None
+    instance._saved_author_id = None
+    if instance.pk is not None and not instance._state.adding:
+        saved = Post.objects.filter(pk=instance.pk).values_list(
+            'group', 'author'
+        ).first()
+        if saved is not None:
+            instance._saved_group_id, instance._saved_author_id = saved
+        instance.version += 1
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    if created:
+        counts.adjust(counts.post_scopes(instance), 1)
+        stats.shift_author(instance.author_id, 'posts_count', 1)
+        stats.shift_group(instance.group_id, 1)
+        timeline.fan_out(instance)
+        cache.bump_generations(*cache.post_generation_scopes(instance))
+        return
+    cache.bump_generations(*cache.post_generation_scopes(instance))
+    old_author_id = getattr(instance, '_saved_author_id', None)
+    if old_author_id is not None and old_author_id != instance.author_id:
+        author_changed(instance, old_author_id)
+    old_group_id = getattr(instance, '_saved_group_id', None)
+    if old_group_id != instance.group_id:
+        old_group = Group.objects.filter(pk=old_group_id).first()
+        if old_group is not None:
+            cache.bump_generations(cache.group_scope(old_group.slug))
+        if old_group_id:
+            counts.adjust([counts.group_scope(old_group_id)], -1)
+        if instance.group_id:
+            counts.adjust([counts.group_scope(instance.group_id)], 1)
+        stats.shift_group(old_group_id, -1)
+        stats.shift_group(instance.group_id, 1)
+
+
+def author_changed(post, old_author_id):
+    counts.adjust([counts.author_scope(old_author_id)], -1)
+    counts.adjust([counts.author_scope(post.author_id)], 1)
+    stats.shift_author(old_author_id, 'posts_count', -1)
+    stats.shift_author(post.author_id, 'posts_count', 1)
+    # Пост переходит из лент подписчиков прежнего автора к новым.
+    timeline.withdraw(post.pk)
+    timeline.fan_out(post)
+    old_username = User.objects.filter(pk=old_author_id).values_list(
+        'username', flat=True
+    ).first()
+    if old_username is not None:
+        cache.bump_generations(cache.author_scope(old_username))
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counts.adjust(counts.post_scopes(instance), -1)
+    stats.shift_author(instance.author_id, 'posts_count', -1)
+    stats.shift_group(instance.group_id, -1)
+    cache.bump_generations(*cache.post_generation_scopes(instance))
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        stats.shift_comments(instance.post_id, 1)
+    cache.bump_generations(
+        cache.post_scope(instance.post_id), cache.COMMENTS_SCOPE
+    )
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    stats.shift_comments(instance.post_id, -1)
+    cache.bump_generations(
+        cache.post_scope(instance.post_id), cache.COMMENTS_SCOPE
+    )
+
+
+@receiver(pre_save, sender=Group)
+def remember_slug(sender, instance, **kwargs):
+    instance._saved_slug = None
+    if instance.pk is not None and not instance._state.adding:
+        instance._saved_slug = Group.objects.filter(
+            pk=instance.pk
+        ).values_list('slug', flat=True).first()
+
+
+def group_author_scopes(group):
+    # Название и ссылка группы есть на страницах авторов её постов.
+    usernames = User.objects.filter(posts__group=group).values_list(
+        'username', flat=True
+    ).distinct()
+    return [cache.author_scope(username) for username in usernames]
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, **kwargs):
+    scopes = [cache.FEED_SCOPE, cache.group_scope(instance.slug)]
+    if not created:
+        instance.posts.update(version=F('version') + 1)
+        scopes += group_author_scopes(instance)
+    old_slug = getattr(instance, '_saved_slug', None)
+    if old_slug and old_slug != instance.slug:
+        scopes.append(cache.group_scope(old_slug))
+    cache.bump_generations(*scopes)
+
+
+@receiver(pre_delete, sender=Group)
+def remember_group_authors(sender, instance, **kwargs):
+    # После удаления у постов уже не будет группы (SET_NULL).
+    instance._author_scopes = group_author_scopes(instance)
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    counts.invalidate(counts.group_scope(instance.pk))
+    cache.bump_generations(
+        cache.FEED_SCOPE,
+        cache.group_scope(instance.slug),
+        *getattr(instance, '_author_scopes', []),
+    )
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    counts.invalidate(counts.follow_scope(instance.user_id))
+    if created:
+        stats.shift_author(instance.author_id, 'followers_count', 1)
+        stats.shift_author(instance.user_id, 'following_count', 1)
+        timeline.backfill(instance.user_id, instance.author_id)
+    cache.bump_generations(
+        cache.author_scope(instance.author.username),
+        cache.follower_scope(instance.user_id),
+    )
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counts.invalidate(counts.follow_scope(instance.user_id))
+    stats.shift_author(instance.author_id, 'followers_count', -1)
+    stats.shift_author(instance.user_id, 'following_count', -1)
+    timeline.prune(instance.user_id, instance.author_id)
+    cache.bump_generations(
+        cache.author_scope(instance.author.username),
+        cache.follower_scope(instance.user_id),
+    )
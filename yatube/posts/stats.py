@@ -0,0 +1,68 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import AuthorStats, Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+def _shift(queryset, field, delta):
+    value = F(field) + delta
+    if delta < 0:
+        # Разошедшийся с данными счётчик не уходит ниже нуля (CHECK у
+        # PositiveIntegerField); точное значение вернёт repair_counters.
+        value = Greatest(value, 0)
+    return queryset.update(**{field: value})
+
+
+def shift_author(user_id, field, delta):
+    updated = _shift(AuthorStats.objects.filter(user=user_id), field, delta)
+    if not updated and delta > 0:
+        # Строки нет (например, после bulk_create) - считаем точно.
+        repair_authors(User.objects.filter(pk=user_id))
+
+
+def shift_group(group_id, delta):
+    if group_id:
+        _shift(Group.objects.filter(pk=group_id), 'posts_count', delta)
+
+
+def shift_comments(post_id, delta):
+    _shift(Post.objects.filter(pk=post_id), 'comments_count', delta)
+
+
+def _count(queryset, field):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('pk')}).order_by().values(
+                field
+            ).annotate(total=Count('pk')).values('total')
+        ),
+        0,
+    )
+
+
+def repair_authors(users=None):
+    users = User.objects.all() if users is None else users
+    AuthorStats.objects.bulk_create(
+        (AuthorStats(user_id=pk) for pk in users.values_list('pk', flat=True)),
+        ignore_conflicts=True,
+    )
+    return AuthorStats.objects.filter(user__in=users.values('pk')).update(
+        posts_count=_count(Post.objects.all(), 'author'),
+        followers_count=_count(Follow.objects.all(), 'author'),
+        following_count=_count(Follow.objects.all(), 'user'),
+    )
+
+
+def repair_groups():
+    return Group.objects.update(
+        posts_count=_count(Post.objects.all(), 'group')
+    )
+
+
+def repair_posts():
+    return Post.objects.update(
+        comments_count=_count(Comment.objects.all(), 'post')
+    )
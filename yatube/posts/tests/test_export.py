@@ -0,0 +1,93 @@
+import csv
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.utils import timezone
+from posts import export
+from posts.models import Comment, Follow, Post
+
+User = get_user_model()
+
+
+class ExportCommandTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.reader = User.objects.create(username='reader')
+        cls.posts = [
+            Post.objects.create(text=f'Пост, "{number}"', author=cls.author)
+            for number in range(5)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.reader, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def export(self, *args, **options):
+        out = StringIO()
+        call_command('export_data', *args, stdout=out, **options)
+        return out.getvalue()
+
+    def test_ndjson(self):
+        lines = self.export('posts', chunk_size=2).splitlines()
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual(
+            [row['id'] for row in rows], [post.pk for post in self.posts]
+        )
+        self.assertEqual(rows[0]['text'], 'Пост, "0"')
+        self.assertEqual(rows[0]['author_id'], self.author.pk)
+        comment, = map(json.loads, self.export('comments').splitlines())
+        self.assertEqual(comment['text'], 'Комментарий')
+
+    def test_csv_to_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'follows.csv')
+            self.export('follows', format='csv', output=path)
+            with open(path, encoding='utf-8', newline='') as source:
+                rows = list(csv.reader(source))
+        self.assertEqual(rows, [
+            ['id', 'user_id', 'author_id'],
+            [
+                str(Follow.objects.get().pk),
+                str(self.reader.pk),
+                str(self.author.pk),
+            ],
+        ])
+
+    def test_csv_formulas_neutralised(self):
+        Post.objects.create(text='=HYPERLINK("http://x")', author=self.author)
+        Post.objects.create(text='-1+2', author=self.author)
+        rows = list(csv.reader(StringIO(self.export('posts', format='csv'))))
+        self.assertEqual(
+            [row[4] for row in rows[-2:]],
+            ['\'=HYPERLINK("http://x")', "'-1+2"],
+        )
+        self.assertEqual(rows[1][4], 'Пост, "0"')
+
+    def test_incremental(self):
+        rows = self.export('posts', after_id=self.posts[2].pk).splitlines()
+        self.assertEqual(len(rows), 2)
+        Post.objects.filter(pk=self.posts[4].pk).update(
+            pub_date=timezone.now() + timedelta(days=1)
+        )
+        since = (timezone.now() + timedelta(hours=1)).isoformat()
+        row, = self.export('posts', since=since).splitlines()
+        self.assertEqual(json.loads(row)['id'], self.posts[4].pk)
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(CommandError):
+            self.export('posts', since='вчера')
+        with self.assertRaises(CommandError):
+            self.export('follows', since='2024-01-01')
+
+    def test_rows_are_read_in_chunks(self):
+        source = export.rows('posts', chunk_size=2)
+        self.assertNotIsInstance(source, list)
+        self.assertEqual(next(source)[0], self.posts[0].pk)
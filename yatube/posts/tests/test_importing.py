@@ -0,0 +1,119 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts.models import AuthorStats, Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ImportContentTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.mkdtemp()
+        cls.author = User.objects.create(username='author')
+        cls.reader = User.objects.create(username='reader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as target:
+            target.write(content)
+        return path
+
+    def ndjson(self, name, rows):
+        lines = ''.join(json.dumps(row) + '\n' for row in rows)
+        return self.write(name, lines)
+
+    def run_import(self, **files):
+        out = StringIO()
+        call_command('import_content', stdout=out, batch_size=2, **files)
+        return out.getvalue()
+
+    def test_import(self):
+        profile = reverse('posts:profile', kwargs={'username': 'author'})
+        Client().get(profile)
+        output = self.run_import(
+            groups=self.write(
+                'groups.csv', 'slug,title\ncats,Кошки\n'
+            ),
+            posts=self.ndjson('posts.ndjson', [
+                {'id': 10, 'text': 'Старый пост', 'author': 'author',
+                 'group': 'cats', 'pub_date': '2015-03-01T12:00:00Z'},
+                {'id': 11, 'text': 'Новичок', 'author': 'newcomer',
+                 'pub_date': '2016-01-01T00:00:00'},
+                {'id': 12, 'text': 'Без автора'},
+            ]),
+            comments=self.ndjson('comments.ndjson', [
+                {'post': 10, 'author': 'reader', 'text': 'Комментарий',
+                 'created': '2015-03-02T00:00:00Z'},
+                {'post': 99, 'author': 'reader', 'text': 'Потерянный'},
+            ]),
+            follows=self.write(
+                'follows.csv',
+                'user,author\n'
+                'reader,author\n'
+                'reader,newcomer\n'
+                'author,author\n',
+            ),
+        )
+        self.assertIn('posts - 2', output)
+        self.assertRegex(output, r'follows - 1 .*пропущено 2')
+        self.assertIn('в секунду), пропущено 1', output)
+        post = Post.objects.get(text='Старый пост')
+        self.assertEqual(post.pub_date.year, 2015)
+        self.assertEqual(post.group, Group.objects.get(slug='cats'))
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(post.comments.get().created.day, 2)
+        self.assertEqual(Comment.objects.count(), 1)
+        self.assertEqual(Follow.objects.count(), 2)
+        newcomer = User.objects.get(username='newcomer')
+        self.assertFalse(newcomer.has_usable_password())
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.reader).following_count, 2
+        )
+        self.assertContains(Client().get(profile), 'Старый пост')
+        self.assertGreater(
+            Post.objects.create(text='После', author=self.author).pk,
+            post.pk,
+        )
+
+    def test_invalid_source(self):
+        for content in ('{"text": "пост"\n', '[1]\n'):
+            with self.subTest(content=content):
+                path = self.write('posts.ndjson', content)
+                with self.assertRaises(CommandError):
+                    self.run_import(posts=path)
+        with self.assertRaises(CommandError):
+            self.run_import()
+
+    def test_loaded_files_kept_after_error(self):
+        profile = reverse('posts:profile', kwargs={'username': 'author'})
+        Client().get(profile)
+        with self.assertRaises(CommandError):
+            self.run_import(
+                posts=self.ndjson('posts.ndjson', [
+                    {'id': 1, 'text': 'Загружен', 'author': 'author'},
+                ]),
+                comments=self.write('comments.ndjson', 'не JSON\n'),
+            )
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.author).posts_count, 1
+        )
+        self.assertContains(Client().get(profile), 'Загружен')
@@ -0,0 +1,79 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.test import TestCase
+from django.urls import reverse
+from posts import lookups
+from posts.models import AuthorStats, Group, Post
+
+User = get_user_model()
+
+
+class LookupCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        Group.objects.create(
+            title='Группа', slug='slug', description='Описание группы'
+        )
+
+    def setUp(self):
+        cache.clear()
+        lookups.groups.clear()
+        lookups.authors.clear()
+
+    def test_rows_read_once(self):
+        with self.assertNumQueries(1):
+            first = lookups.groups.get('slug')
+        with self.assertNumQueries(0):
+            second = lookups.groups.get('slug')
+        self.assertEqual(first, second)
+        self.assertIsNot(first, second)
+
+    def test_misses_cached_until_created(self):
+        url = reverse('posts:group_list', kwargs={'slug': 'new'})
+        self.assertEqual(self.client.get(url).status_code, 404)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).status_code, 404)
+        Group.objects.create(title='Новая', slug='new', description='')
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_misses_not_stored_in_shared_cache(self):
+        shared = caches['shared']
+        files = len(shared._list_cache_files())
+        for number in range(20):
+            for url in (
+                reverse('posts:group_list', args=[f'crawl{number}']),
+                reverse('posts:profile', args=[f'bot{number}']),
+            ):
+                self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(len(shared._list_cache_files()), files)
+
+    def test_renamed_author(self):
+        self.assertEqual(lookups.authors.get('author'), self.author)
+        user = User.objects.get(pk=self.author.pk)
+        user.username = 'renamed'
+        user.save()
+        self.assertIsNone(lookups.authors.get('author'))
+        self.assertEqual(lookups.authors.get('renamed'), user)
+        user.username = 'author'
+        user.save()
+
+    def test_instances_not_shared(self):
+        author = lookups.authors.get('author')
+        author.stats.posts_count = 10
+        self.assertEqual(lookups.authors.get('author').stats.posts_count, 0)
+
+    def test_stats_read_with_author(self):
+        with self.assertNumQueries(1):
+            author = lookups.authors.get('author')
+            self.assertEqual(author.stats.posts_count, 0)
+            self.assertIs(author.stats.user, author)
+        Post.objects.create(text='Пост', author=self.author)
+        self.assertEqual(
+            lookups.authors.get('author').stats.posts_count, 1
+        )
+        User.objects.create(username='nostats')
+        AuthorStats.objects.filter(user__username='nostats').delete()
+        with self.assertRaises(AuthorStats.DoesNotExist):
+            lookups.authors.get('nostats').stats
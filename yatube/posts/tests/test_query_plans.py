@@ -0,0 +1,101 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# Полный перебор таблицы без индекса или сортировка во временном B-дереве.
+# Строка плана целиком: старые SQLite пишут «SCAN TABLE t [AS a]», новые -
+# «SCAN t»; перебор по индексу заканчивается на «USING ... INDEX i».
+BAD_PLAN = re.compile(
+    r'USE TEMP B-TREE|\bSCAN (?:TABLE )?\w+(?: AS \w+)?$', re.MULTILINE
+)
+
+
+class QueryPlanTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.reader = User.objects.create(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа',
+            slug='slug',
+            description='Описание группы',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(15):
+            post = Post.objects.create(
+                text=f'Пост {i}', author=cls.author, group=cls.group
+            )
+        cls.post = post
+        Comment.objects.create(
+            text='Комментарий', author=cls.reader, post=post
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+        cache.clear()
+
+    def plans(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        for query in queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT') or 'posts_' not in sql:
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                plan = '\n'.join(row[-1] for row in cursor.fetchall())
+            yield sql, plan, response
+
+    def test_bad_plan_pattern(self):
+        bad = [
+            'SCAN posts_post',
+            'SCAN TABLE posts_post',
+            'SCAN TABLE posts_post AS U0',
+            'SEARCH posts_follow USING INDEX i (user_id=?)\nSCAN U0',
+            'USE TEMP B-TREE FOR ORDER BY',
+        ]
+        good = [
+            'SCAN posts_post USING INDEX posts_post_pub_date',
+            'SCAN TABLE posts_post USING INDEX posts_post_pub_date',
+            'SCAN TABLE posts_post AS U0 USING COVERING INDEX i',
+            'SEARCH TABLE posts_post USING INTEGER PRIMARY KEY (rowid=?)',
+        ]
+        for plan in bad:
+            with self.subTest(plan=plan):
+                self.assertIsNotNone(BAD_PLAN.search(plan))
+        for plan in good:
+            with self.subTest(plan=plan):
+                self.assertIsNone(BAD_PLAN.search(plan))
+
+    def test_views_use_indexes(self):
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'slug'}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+            reverse('posts:follow_index'),
+            reverse('posts:post_comments', kwargs={'post_id': self.post.pk}),
+        ]
+        for url in list(urls):
+            urls.append(url + '?page=2')
+            response = self.client.get(url + '?after=')
+            page_obj = response.context and response.context.get('page_obj')
+            if page_obj is not None and page_obj.has_next():
+                urls.append(f'{url}?after={page_obj.next_cursor}')
+                urls.append(f'{url}?before={page_obj.next_cursor}')
+        for url in urls:
+            cache.clear()
+            for sql, plan, response in self.plans(url):
+                with self.subTest(url=url, sql=sql):
+                    self.assertIsNone(BAD_PLAN.search(plan), plan)
@@ -0,0 +1,87 @@
+from django.contrib.admin.sites import site
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+from posts import search
+from posts.models import Post
+
+User = get_user_model()
+
+
+class PostSearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.once = Post.objects.create(
+            text='Морской воздух и сосны', author=cls.author
+        )
+        cls.twice = Post.objects.create(
+            text='Море, море <b>и</b> ещё раз МОРЕ', author=cls.author
+        )
+        Post.objects.create(text='Горы и снег', author=cls.author)
+
+    def search_page(self, query, after=None):
+        data = {'q': query}
+        if after:
+            data['after'] = after
+        return self.client.get(reverse('posts:search'), data)
+
+    def test_results_ranked_and_highlighted(self):
+        response = self.search_page('море')
+        posts = list(response.context['page_obj'])
+        self.assertEqual(posts, [self.twice])
+        self.assertContains(response, '<mark>Море</mark>, <mark>море</mark>')
+        # Разметка из текста поста экранируется.
+        self.assertContains(response, '&lt;b&gt;и&lt;/b&gt;')
+
+    def test_index_follows_edits_and_deletes(self):
+        post = Post.objects.get(pk=self.once.pk)
+        post.text = 'Тихое море'
+        post.save()
+        self.assertEqual(len(self.search_page('море').context['page_obj']), 2)
+        Post.objects.get(pk=self.twice.pk).delete()
+        self.assertEqual(
+            list(self.search_page('море').context['page_obj']), [self.once]
+        )
+
+    def test_migrate_restores_dropped_triggers(self):
+        self.assertEqual(search.ensure_index(), [])
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER posts_post_fts_insert')
+        post = Post.objects.create(text='Потерянное озеро', author=self.author)
+        self.assertEqual(search.ensure_index(), ['posts_post_fts_insert'])
+        self.assertEqual(
+            list(self.search_page('озеро').context['page_obj']), [post]
+        )
+        Post.objects.create(text='Новое озеро', author=self.author)
+        self.assertEqual(len(self.search_page('озеро').context['page_obj']), 2)
+
+    def test_keyset_pages(self):
+        for number in range(12):
+            Post.objects.create(text=f'лес {number}', author=self.author)
+        first = self.search_page('лес').context['page_obj']
+        self.assertTrue(first.has_next())
+        second = self.search_page('лес', first.next_cursor)
+        second = second.context['page_obj']
+        self.assertFalse(second.has_next())
+        ids = [post.pk for post in first] + [post.pk for post in second]
+        self.assertEqual(len(set(ids)), 12)
+
+    def test_query_syntax_is_not_interpreted(self):
+        response = self.search_page('море" OR (')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['page_obj']), 0)
+
+    def test_admin_uses_index(self):
+        admin = site._registry[Post]
+        request = RequestFactory().get('/admin/posts/post/', {'q': 'горы'})
+        queryset, distinct = admin.get_search_results(
+            request, Post.objects.all(), 'горы'
+        )
+        self.assertFalse(distinct)
+        self.assertEqual(
+            list(queryset.values_list('text', flat=True)), ['Горы и снег']
+        )
+        self.assertIn(search.FTS_TABLE, str(queryset.query))
@@ -0,0 +1,66 @@
+import os
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from posts import seeding
+from posts.models import (AuthorStats, Comment, Follow, Group, Post,
+                          TimelineEntry)
+
+User = get_user_model()
+
+
+class SeedingGeneratorTests(SimpleTestCase):
+    def test_batches_are_deterministic(self):
+        args = (7, 3, 100, 50, (1, 40), (1, 4), [], 0, 0, 1e9)
+        self.assertEqual(seeding.posts(*args), seeding.posts(*args))
+        self.assertNotEqual(
+            seeding.posts(*args), seeding.posts(8, *args[1:])
+        )
+
+    def test_followers_follow_power_law(self):
+        rows = seeding.follows(0, 0, 1, 2000, (1, 2000), 10)
+        followers = [0] * 2001
+        for user, author in rows:
+            self.assertNotEqual(user, author)
+            followers[author] += 1
+        self.assertEqual(len(rows), len(set(rows)))
+        # Первые авторы собирают подписчиков больше всей второй половины.
+        self.assertGreater(sum(followers[1:11]), sum(followers[1001:]))
+
+
+class SeedCommandTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_seed_and_rebuild_derived_data(self):
+        call_command(
+            'seed_yatube', users=30, groups=3, posts=200, comments=300,
+            follows=5, workers=0, batch_size=64, days=10,
+            stdout=open(os.devnull, 'w'),
+        )
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 300)
+        self.assertEqual(AuthorStats.objects.count(), 30)
+        stats = AuthorStats.objects.order_by('user').first()
+        self.assertEqual(
+            stats.followers_count,
+            Follow.objects.filter(author=stats.user_id).count(),
+        )
+        follow = Follow.objects.first()
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=follow.user_id).count(),
+            Post.objects.filter(
+                author__following__user=follow.user_id
+            ).count(),
+        )
+        # Даты распределены по периоду, а не равны моменту вставки.
+        oldest = Post.objects.order_by('pub_date').first().pub_date
+        self.assertLess(oldest, timezone.now() - timedelta(days=1))
+        post = Post.objects.order_by('-comments_count').first()
+        self.assertEqual(post.comments_count, post.comments.count())
@@ -0,0 +1,157 @@
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts import thumbnails
+from posts.models import Post
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.images import ImageFile
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x01\x00'
+    b'\x01\x00\x00\x00\x00\x21\xf9\x04'
+    b'\x01\x0a\x00\x01\x00\x2c\x00\x00'
+    b'\x00\x00\x01\x00\x01\x00\x00\x02'
+    b'\x02\x4c\x01\x00\x3b'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class GenerateThumbnailsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.post = Post.objects.create(
+            text='Пост',
+            author=cls.author,
+            image=SimpleUploadedFile(
+                name='small.gif', content=SMALL_GIF, content_type='image/gif'
+            ),
+        )
+        Post.objects.create(text='Без картинки', author=cls.author)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_backfill_existing_images(self):
+        source = ImageFile(self.post.image)
+        self.assertIsNone(default.kvstore.get(source))
+        out = StringIO()
+        call_command('generate_thumbnails', workers=1, stdout=out)
+        self.assertIn('Готово: 1, с ошибкой: 0', out.getvalue())
+        self.assertIsNotNone(default.kvstore.get(source))
+
+    def test_prefetch_reads_generated_thumbnail(self):
+        thumb = get_thumbnail(
+            self.post.image, '960x339', crop='center', upscale=True
+        )
+        posts = list(Post.objects.order_by('id'))
+        with self.assertNumQueries(0):
+            thumbnails.prefetch(posts)
+        self.assertEqual(posts[0].thumb.url, thumb.url)
+        self.assertEqual(posts[0].thumb.size, thumb.size)
+        self.assertIsNone(posts[1].thumb)
+
+    def test_prefetch_reads_database_once_on_cache_miss(self):
+        thumb = get_thumbnail(
+            self.post.image, '960x339', crop='center', upscale=True
+        )
+        cache.clear()
+        posts = list(Post.objects.order_by('id')) * 3
+        with self.assertNumQueries(1):
+            thumbnails.prefetch(posts)
+        self.assertEqual(posts[0].thumb.url, thumb.url)
+        with self.assertNumQueries(0):
+            thumbnails.prefetch(posts)
+
+    def test_prefetch_leaves_missing_thumbnail_to_template(self):
+        post = Post.objects.get(pk=self.post.pk)
+        thumbnails.prefetch([post])
+        self.assertIsNone(post.thumb)
+
+    def test_prefetch_falls_back_to_template(self):
+        get_thumbnail(self.post.image, '960x339', crop='center', upscale=True)
+        post = Post.objects.get(pk=self.post.pk)
+        with mock.patch.object(
+            default.backend, '_get_thumbnail_filename',
+            side_effect=AttributeError,
+        ):
+            thumbnails.prefetch([post])
+        self.assertIsNone(post.thumb)
+        with mock.patch.object(default, 'kvstore', object()):
+            with self.assertNumQueries(0):
+                thumbnails.prefetch([post])
+        self.assertIsNone(post.thumb)
+        response = Client().get(reverse('posts:index'))
+        self.assertContains(response, '<img class="card-img my-2"')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ScheduleThumbnailsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        cache.clear()
+        # В TestCase транзакция не фиксируется: on_commit - сразу.
+        patcher = mock.patch(
+            'django.db.transaction.on_commit', side_effect=lambda func: func()
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def upload(self, name):
+        return SimpleUploadedFile(
+            name=name, content=SMALL_GIF, content_type='image/gif'
+        )
+
+    def thumbnail_exists(self, post):
+        return default.kvstore.get(ImageFile(post.image)) is not None
+
+    def test_create_and_edit_generate_thumbnail(self):
+        self.author_client.post(reverse('posts:post_create'), data={
+            'text': 'Пост', 'image': self.upload('first.gif'),
+        })
+        post = Post.objects.get()
+        self.assertTrue(self.thumbnail_exists(post))
+        url = reverse('posts:post_edit', kwargs={'post_id': post.pk})
+        self.author_client.post(url, data={
+            'text': 'Пост', 'image': self.upload('second.gif'),
+        })
+        post.refresh_from_db()
+        self.assertIn('second', post.image.name)
+        self.assertTrue(self.thumbnail_exists(post))
+
+    def test_edit_without_new_image_schedules_nothing(self):
+        post = Post.objects.create(
+            text='Пост', author=self.author, image=self.upload('kept.gif')
+        )
+        url = reverse('posts:post_edit', kwargs={'post_id': post.pk})
+        with mock.patch.object(thumbnails, 'schedule') as schedule:
+            self.author_client.post(url, data={'text': 'Новый текст'})
+        schedule.assert_not_called()
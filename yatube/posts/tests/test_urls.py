@@ -81,6 +81,7 @@ class StaticURLTests(TestCase):
             '/group/slug/': 'posts/group_list.html',
             '/profile/Unknown/': 'posts/profile.html',
             f'/posts/{self.post.pk}/': 'posts/post_detail.html',
+            '/search/?q=текст': 'posts/search.html',
         }
         for address, template in urls_templates_names_guests.items():
             with self.subTest(address=address):
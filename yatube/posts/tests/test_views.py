@@ -1,14 +1,27 @@
+import os
 import shutil
 import tempfile
+from datetime import timedelta
+from unittest import mock
 
+from core.nplusone import NPlusOneAssertionsMixin
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.db.models import F
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from posts.models import Comment, Follow, Group, Post
+from posts import counts, timeline
+from posts.cache import (FEED_SCOPE, bump_generations, group_scope,
+                         page_key)
+from posts.models import (AuthorStats, Comment, Follow, Group, Post,
+                          TimelineEntry)
+from posts.paginators import CachedCountPaginator
 
 User = get_user_model()
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -280,17 +293,41 @@ class PostContextTests(TestCase):
     def test_cache_index(self):
         response = self.auth_client.get(reverse('posts:index'))
         posts = response.content
+        Post.objects.filter(pk=self.post2.pk).update(text='Изменён в обход')
+        response_old = self.auth_client.get(reverse('posts:index'))
+        self.assertEqual(response_old.content, posts)
         Post.objects.create(
             text='Новый пост',
             author=self.author2,
         )
-        response_old = self.auth_client.get(reverse('posts:index'))
-        posts_old = response_old.content
-        self.assertEqual(posts_old, posts)
-        cache.clear()
         response_new = self.auth_client.get(reverse('posts:index'))
-        posts_new = response_new.content
-        self.assertNotEqual(posts_old, posts_new)
+        self.assertNotEqual(response_new.content, posts)
+        self.assertContains(response_new, 'Новый пост')
+
+    def test_cache_invalidated_by_scope(self):
+        urls = {
+            'group': reverse('posts:group_list', kwargs={'slug': 'slug'}),
+            'author': reverse(
+                'posts:profile', kwargs={'username': self.author.username}
+            ),
+            'author2': reverse(
+                'posts:profile', kwargs={'username': self.author2.username}
+            ),
+        }
+        before = {
+            name: self.auth_client.get(url).content
+            for name, url in urls.items()
+        }
+        Post.objects.create(
+            text='Пост в группе', author=self.author, group=self.group
+        )
+        after = {
+            name: self.auth_client.get(url).content
+            for name, url in urls.items()
+        }
+        self.assertNotEqual(before['group'], after['group'])
+        self.assertNotEqual(before['author'], after['author'])
+        self.assertEqual(before['author2'], after['author2'])
 
 
 class PostPaginatorTests(TestCase):
@@ -354,3 +391,690 @@ class PostPaginatorTests(TestCase):
         response = self.auth_client.get('http://127.0.0.1:8000/?page=2')
         objects = response.context['page_obj']
         self.assertEqual(len(objects), 4)
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.group = Group.objects.create(
+            title='Группа',
+            slug='slug',
+            description='Описание группы',
+        )
+        for i in range(25):
+            Post.objects.create(
+                text=f'Пост {i}',
+                author=cls.author,
+                group=cls.group,
+            )
+
+    def setUp(self):
+        self.auth_client = Client()
+        self.auth_client.force_login(self.author)
+        cache.clear()
+
+    def test_cursor_pages(self):
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'slug'}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+        )
+        expected = list(Post.objects.order_by('-pub_date', '-id'))
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.auth_client.get(url + '?after=')
+                page = response.context['page_obj']
+                self.assertEqual(list(page), expected[:10])
+                self.assertFalse(page.has_previous())
+                page = self.auth_client.get(
+                    f'{url}?after={page.next_cursor}'
+                ).context['page_obj']
+                self.assertEqual(list(page), expected[10:20])
+                page = self.auth_client.get(
+                    f'{url}?after={page.next_cursor}'
+                ).context['page_obj']
+                self.assertEqual(list(page), expected[20:])
+                self.assertFalse(page.has_next())
+                page = self.auth_client.get(
+                    f'{url}?before={page.previous_cursor}'
+                ).context['page_obj']
+                self.assertEqual(list(page), expected[10:20])
+
+    def test_broken_cursor(self):
+        response = self.auth_client.get(reverse('posts:index') + '?after=xyz')
+        self.assertEqual(len(response.context['page_obj']), 10)
+
+    def test_page_number_mode_kept(self):
+        response = self.auth_client.get(reverse('posts:index') + '?page=3')
+        self.assertEqual(response.context['page_obj'].number, 3)
+        self.assertEqual(len(response.context['page_obj']), 5)
+
+
+class PostCountCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.reader = User.objects.create(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа',
+            slug='slug',
+            description='Описание группы',
+        )
+        for i in range(3):
+            Post.objects.create(text=f'Пост {i}', author=cls.author)
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        cache.clear()
+
+    def cached(self, scope):
+        return cache.get(counts.count_key(scope))
+
+    def test_count_cached_on_miss(self):
+        url = reverse('posts:group_list', kwargs={'slug': 'slug'})
+        response = self.reader_client.get(url)
+        self.assertEqual(response.context['page_obj'].paginator.count, 0)
+        self.assertEqual(self.cached(counts.group_scope(self.group.pk)), 0)
+        with CaptureQueriesContext(connection) as queries:
+            self.reader_client.get(url)
+        for query in queries:
+            self.assertNotIn('COUNT(', query['sql'])
+
+    def test_signals_adjust_counts(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.reader_client.get(reverse('posts:index'))
+        self.reader_client.get(reverse('posts:follow_index'))
+        self.reader_client.get(
+            reverse('posts:profile', kwargs={'username': 'author'})
+        )
+        post = Post.objects.create(
+            text='Новый пост', author=self.author, group=self.group
+        )
+        self.assertEqual(self.cached(counts.GLOBAL_SCOPE), 4)
+        self.assertEqual(self.cached(counts.author_scope(self.author.pk)), 4)
+        # Ленты подписчиков не правятся, а пересчитываются по сроку.
+        self.assertEqual(self.cached(counts.follow_scope(self.reader.pk)), 3)
+        self.assertIsNone(self.cached(counts.group_scope(self.group.pk)))
+        post.delete()
+        self.assertEqual(self.cached(counts.GLOBAL_SCOPE), 3)
+        Follow.objects.filter(user=self.reader).delete()
+        self.assertIsNone(self.cached(counts.follow_scope(self.reader.pk)))
+
+    def test_publishing_does_not_touch_followers(self):
+        for number in range(5):
+            follower = User.objects.create(username=f'follower{number}')
+            Follow.objects.create(user=follower, author=self.author)
+        # Знаменитости без раскладки: остаётся только учёт счётчиков.
+        with override_settings(TIMELINE_FANOUT_LIMIT=0), \
+                CaptureQueriesContext(connection) as queries:
+            Post.objects.create(text='Новый пост', author=self.author)
+        for query in queries:
+            self.assertNotIn('posts_follow', query['sql'])
+
+    def test_follow_counts_expire(self):
+        counts.store({
+            counts.follow_scope(self.reader.pk): 3,
+            counts.GLOBAL_SCOPE: 3,
+        })
+        with override_settings(FOLLOW_COUNT_CACHE_TIMEOUT=0):
+            counts.store({counts.follow_scope(self.reader.pk): 3})
+        self.assertIsNone(self.cached(counts.follow_scope(self.reader.pk)))
+        self.assertEqual(self.cached(counts.GLOBAL_SCOPE), 3)
+
+    def test_last_page_keeps_orphans(self):
+        paginator = CachedCountPaginator(
+            Post.objects.order_by('id'), 2, orphans=1,
+            count_scope=counts.author_scope(self.author.pk),
+        )
+        self.assertEqual(paginator.num_pages, 1)
+        self.assertEqual(len(paginator.page(1)), 3)
+
+    def test_reconcile_command(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        cache.set(counts.count_key(counts.GLOBAL_SCOPE), 100)
+        call_command('reconcile_post_counts', stdout=open(os.devnull, 'w'))
+        self.assertEqual(self.cached(counts.GLOBAL_SCOPE), 3)
+        self.assertEqual(self.cached(counts.author_scope(self.author.pk)), 3)
+        self.assertEqual(self.cached(counts.follow_scope(self.reader.pk)), 3)
+        self.assertEqual(self.cached(counts.group_scope(self.group.pk)), 0)
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.reader = User.objects.create(username='reader')
+        cls.old_post = Post.objects.create(
+            text='Старый пост', author=cls.author
+        )
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        cache.clear()
+
+    def entries(self):
+        return TimelineEntry.objects.filter(user=self.reader)
+
+    def feed(self):
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_follow_fan_out_unfollow(self):
+        self.reader_client.get(
+            reverse('posts:profile_follow', kwargs={'username': 'author'})
+        )
+        self.assertEqual(self.entries().count(), 1)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertTrue(self.entries().filter(post=post).exists())
+        self.assertEqual(self.feed(), [post, self.old_post])
+        self.reader_client.get(
+            reverse('posts:profile_unfollow', kwargs={'username': 'author'})
+        )
+        self.assertFalse(self.entries().exists())
+        self.assertEqual(self.feed(), [])
+
+    def test_reassigned_post_moves_between_feeds(self):
+        other = User.objects.create(username='other')
+        other_reader = User.objects.create(username='other_reader')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=other_reader, author=other)
+        post = Post.objects.get(pk=self.old_post.pk)
+        post.author = other
+        post.save()
+        self.assertFalse(self.entries().exists())
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=other_reader, post=post).exists()
+        )
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_celebrity_posts_read_on_demand(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertFalse(self.entries().filter(post=post).exists())
+        self.assertEqual(self.feed(), [post, self.old_post])
+        later = Post.objects.create(text='Ещё пост', author=self.author)
+        self.assertEqual(self.feed(), [later, post, self.old_post])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_rebuild_keeps_celebrity_posts(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        # Старше запаса PULL_OVERLAP, чтобы метка дочитывания их отсекала.
+        for model in (Post, TimelineEntry):
+            model.objects.update(pub_date=F('pub_date') - timedelta(days=1))
+        self.assertEqual(self.feed(), [post, self.old_post])
+        with mock.patch('django.db.transaction.on_commit', lambda f: f()):
+            for user_ids in ([self.reader.pk], None):
+                with self.subTest(user_ids=user_ids):
+                    timeline.rebuild(user_ids)
+                    self.assertEqual(self.feed(), [post, self.old_post])
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.reader = User.objects.create(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа',
+            slug='slug',
+            description='Описание группы',
+        )
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        cache.clear()
+
+    def stats(self, user):
+        return AuthorStats.objects.get(user=user)
+
+    def test_counters_follow_writes(self):
+        post = Post.objects.create(
+            text='Пост', author=self.author, group=self.group
+        )
+        self.reader_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': post.pk}),
+            data={'text': 'Комментарий'},
+        )
+        self.reader_client.get(
+            reverse('posts:profile_follow', kwargs={'username': 'author'})
+        )
+        post.refresh_from_db()
+        self.group.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        self.reader_client.get(
+            reverse('posts:profile_unfollow', kwargs={'username': 'author'})
+        )
+        post.delete()
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(self.stats(self.author).posts_count, 0)
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+
+    def test_reassigned_post_counted_for_new_author(self):
+        post = Post.objects.create(text='Чужой пост', author=self.author)
+        pages = {
+            user: reverse('posts:profile', kwargs={'username': user.username})
+            for user in (self.author, self.reader)
+        }
+        for url in pages.values():
+            self.client.get(url)
+        post.author = self.reader
+        post.save()
+        self.assertEqual(self.stats(self.author).posts_count, 0)
+        self.assertEqual(self.stats(self.reader).posts_count, 1)
+        response = self.client.get(pages[self.author])
+        self.assertNotContains(response, 'Чужой пост')
+        self.assertEqual(response.context['page_obj'].paginator.count, 0)
+        response = self.client.get(pages[self.reader])
+        self.assertContains(response, 'Чужой пост')
+        self.assertEqual(response.context['page_obj'].paginator.count, 1)
+
+    def test_drifted_counters_stay_at_zero(self):
+        post = Post.objects.create(
+            text='Пост', author=self.author, group=self.group
+        )
+        comment = Comment.objects.create(
+            text='Текст', author=self.reader, post=post
+        )
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        AuthorStats.objects.update(
+            posts_count=0, followers_count=0, following_count=0
+        )
+        Post.objects.update(comments_count=0)
+        Group.objects.update(posts_count=0)
+        comment.delete()
+        follow.delete()
+        post.delete()
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(self.stats(self.author).posts_count, 0)
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+
+    def test_profile_reads_counter(self):
+        Post.objects.create(text='Пост', author=self.author)
+        url = reverse('posts:profile', kwargs={'username': 'author'})
+        self.reader_client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.reader_client.get(url)
+        self.assertContains(response, 'Всего постов: 1')
+        for query in queries:
+            self.assertNotIn('COUNT(', query['sql'])
+
+    def test_repair_command(self):
+        post = Post.objects.create(
+            text='Пост', author=self.author, group=self.group
+        )
+        Comment.objects.create(text='Текст', author=self.reader, post=post)
+        Follow.objects.create(user=self.reader, author=self.author)
+        AuthorStats.objects.all().delete()
+        Post.objects.update(comments_count=5)
+        Group.objects.update(posts_count=5)
+        call_command('repair_counters', stdout=open(os.devnull, 'w'))
+        post.refresh_from_db()
+        self.group.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+
+
+class PostFragmentCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.group = Group.objects.create(
+            title='Группа',
+            slug='slug',
+            description='Описание группы',
+        )
+        cls.post = Post.objects.create(
+            text='Пост', author=cls.author, group=cls.group
+        )
+
+    def setUp(self):
+        self.auth_client = Client()
+        self.auth_client.force_login(self.author)
+        cache.clear()
+
+    def group_page(self):
+        return self.auth_client.get(
+            reverse('posts:group_list', kwargs={'slug': 'slug'})
+        )
+
+    def test_fragment_reused_until_post_changes(self):
+        self.group_page()
+        Post.objects.filter(pk=self.post.pk).update(text='В обход сигналов')
+        # Страница пересобирается, а фрагмент поста берётся из кэша.
+        bump_generations(group_scope('slug'))
+        self.assertContains(self.group_page(), 'Пост')
+        self.auth_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+            data={'text': 'Новый текст', 'group': self.group.pk},
+        )
+        self.assertContains(self.group_page(), 'Новый текст')
+
+    def test_fragment_invalidated_by_author_change(self):
+        self.group_page()
+        self.author.first_name = 'Лев'
+        self.author.save()
+        self.assertContains(self.group_page(), 'Лев')
+
+
+class SharedPageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.reader = User.objects.create(username='reader')
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        cache.clear()
+
+    def test_skeleton_shared_between_users(self):
+        url = reverse('posts:index')
+        self.client.get(url)
+        Post.objects.filter(pk=self.post.pk).update(text='В обход сигналов')
+        response = self.reader_client.get(url)
+        # Каркас страницы взят из кэша анонимного запроса...
+        self.assertContains(response, 'Пост')
+        # ...а шапка дорисована для текущего пользователя.
+        self.assertContains(response, 'Выйти')
+        self.assertContains(response, 'Избранные авторы')
+        self.assertNotContains(self.client.get(url), 'Выйти')
+
+    def test_follow_button_filled_per_user(self):
+        url = reverse('posts:profile', kwargs={'username': 'author'})
+        self.assertNotContains(self.client.get(url), 'Подписаться')
+        self.assertNotContains(self.author_client.get(url), 'Подписаться')
+        self.assertContains(self.reader_client.get(url), 'Подписаться')
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertContains(self.reader_client.get(url), 'Отписаться')
+
+    def test_post_detail_forms_filled_per_user(self):
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        self.client.get(url)
+        response = self.author_client.get(url)
+        self.assertContains(response, 'Редактировать запись')
+        self.assertContains(response, 'csrfmiddlewaretoken')
+        response = self.reader_client.get(url)
+        self.assertNotContains(response, 'Редактировать запись')
+        self.assertContains(response, 'Добавить комментарий')
+        self.assertNotContains(self.client.get(url), 'Добавить комментарий')
+
+    def test_post_detail_invalidated_by_comment(self):
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        self.client.get(url)
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий'
+        )
+        self.assertContains(self.client.get(url), 'Комментарий')
+
+    def test_profile_follows_group_changes(self):
+        group = Group.objects.create(
+            title='Старая группа', slug='old', description=''
+        )
+        Post.objects.create(text='В группе', author=self.author, group=group)
+        url = reverse('posts:profile', kwargs={'username': 'author'})
+        etag = self.client.get(url)['ETag']
+        group.title = 'Новая группа'
+        group.slug = 'new'
+        group.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Новая группа')
+        self.assertContains(
+            response, reverse('posts:group_list', args=['new'])
+        )
+        group.delete()
+        self.assertNotContains(self.client.get(url), 'Новая группа')
+
+    def test_missing_post_not_cached(self):
+        url = reverse('posts:post_detail', kwargs={'post_id': 999})
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_stale_page_served_while_rebuilding(self):
+        url = reverse('posts:index')
+        self.client.get(url)
+        Post.objects.create(text='Новый пост', author=self.author)
+        lock = 'lock:' + page_key('index', url)
+        cache.add(lock, True)
+        self.assertNotContains(self.client.get(url), 'Новый пост')
+        cache.delete(lock)
+        self.assertContains(self.client.get(url), 'Новый пост')
+
+    def test_stale_page_served_while_database_fails(self):
+        def fail(*args):
+            raise OperationalError('База недоступна')
+
+        index = reverse('posts:index')
+        detail = reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.pk}
+        )
+        etag = self.client.get(index)['ETag']
+        self.client.get(detail)
+        bump_generations(FEED_SCOPE)
+        with connection.execute_wrapper(fail):
+            with self.assertLogs('posts.cache', 'WARNING'):
+                response = self.client.get(index)
+            self.assertContains(response, 'Пост')
+            self.assertEqual(response['ETag'], etag)
+            with self.assertLogs('posts.cache', 'WARNING'):
+                response = self.reader_client.get(detail)
+            self.assertContains(response, 'Пост')
+            # Пользователя не загрузить - личные части как для гостя.
+            self.assertNotContains(response, 'Выйти')
+            with self.assertRaises(OperationalError):
+                self.client.get(reverse('posts:profile', args=['author']))
+
+    def test_early_refresh(self):
+        url = reverse('posts:index')
+        self.client.get(url)
+        Post.objects.bulk_create(
+            [Post(text='В обход сигналов', author=self.author)]
+        )
+        self.assertNotContains(self.client.get(url), 'В обход сигналов')
+        with override_settings(FEED_CACHE_EARLY_REFRESH=10 ** 9):
+            self.assertContains(self.client.get(url), 'В обход сигналов')
+
+
+@override_settings(COMMENTS_PER_PAGE=5)
+class CommentPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def add_comments(self, count):
+        start = Comment.objects.count()
+        for number in range(start, start + count):
+            user = User.objects.create(username=f'reader{number}')
+            Comment.objects.create(
+                post=self.post, author=user, text=f'Комментарий {number}'
+            )
+
+    def detail_page(self):
+        return self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
+
+    def test_constant_number_of_queries(self):
+        self.add_comments(2)
+        with self.assertNumQueries(3):
+            self.detail_page()
+        self.add_comments(7)
+        cache.clear()
+        with self.assertNumQueries(3):
+            response = self.detail_page()
+        self.assertEqual(len(response.context['comments']), 5)
+
+    def test_load_more_fragment(self):
+        self.add_comments(7)
+        comments = self.detail_page().context['comments']
+        self.assertTrue(comments.has_next())
+        response = self.client.get(
+            reverse('posts:post_comments', kwargs={'post_id': self.post.pk}),
+            {'after': comments.next_cursor},
+        )
+        self.assertTemplateUsed(response, 'posts/includes/comment_list.html')
+        self.assertFalse(response.context['comments'].has_next())
+        self.assertContains(response, 'Комментарий 1')
+        self.assertContains(response, 'Комментарий 0')
+        self.assertNotContains(response, 'Комментарий 2')
+
+    def test_comments_of_missing_post(self):
+        url = reverse('posts:post_comments', kwargs={'post_id': 0})
+        for _ in range(2):
+            self.assertEqual(self.client.get(url).status_code, 404)
+        url = reverse('posts:post_comments', kwargs={'post_id': self.post.pk})
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+
+class RepeatedQueriesTests(NPlusOneAssertionsMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create(username='reader')
+        groups = [
+            Group.objects.create(
+                title=f'Группа {number}', slug=f'slug{number}',
+                description='Описание',
+            )
+            for number in range(3)
+        ]
+        for number in range(12):
+            author = User.objects.create(username=f'author{number}')
+            Follow.objects.create(user=cls.reader, author=author)
+            post = Post.objects.create(
+                text=f'Пост {number}', author=author,
+                group=groups[number % len(groups)],
+            )
+            Comment.objects.create(
+                text=f'Комментарий {number}', author=author, post=post
+            )
+        cls.post = post
+        for number in range(6):
+            commenter = User.objects.create(username=f'commenter{number}')
+            Comment.objects.create(
+                text=f'Ответ {number}', author=commenter, post=post
+            )
+
+    def setUp(self):
+        self.client.force_login(self.reader)
+        cache.clear()
+
+    def test_pages_without_repeated_queries(self):
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'slug0'}),
+            reverse('posts:profile', kwargs={'username': 'author0'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+            reverse('posts:post_comments', kwargs={'post_id': self.post.pk}),
+            reverse('posts:follow_index'),
+            reverse('posts:search') + '?q=Пост',
+        ]
+        for url in urls:
+            with self.subTest(url=url), self.assertNoRepeatedQueries():
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.reader = User.objects.create(username='reader')
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        cache.clear()
+
+    def revalidate(self, client, url):
+        etag = client.get(url)['ETag']
+        return client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_not_modified_without_rendering(self):
+        url = reverse('posts:index')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse(response.templates)
+        Post.objects.create(text='Новый пост', author=self.author)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_stale_page_keeps_its_etag(self):
+        url = reverse('posts:index')
+        old_etag = self.client.get(url)['ETag']
+        Post.objects.create(text='Новый пост', author=self.author)
+        lock = 'lock:' + page_key('index', url)
+        cache.add(lock, True)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=old_etag)
+        self.assertNotContains(response, 'Новый пост')
+        self.assertEqual(response['ETag'], old_etag)
+        cache.delete(lock)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=old_etag)
+        self.assertContains(response, 'Новый пост')
+        self.assertEqual(self.revalidate(self.client, url).status_code, 304)
+
+    def test_etag_depends_on_user(self):
+        url = reverse('posts:index')
+        self.assertNotEqual(
+            self.client.get(url)['ETag'], self.reader_client.get(url)['ETag']
+        )
+
+    def test_pages_revalidated(self):
+        urls = [
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+            reverse('posts:follow_index'),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.revalidate(self.reader_client, url)
+                self.assertEqual(response.status_code, 304)
+
+    def test_changes_invalidate_etag(self):
+        detail = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        follow = reverse('posts:follow_index')
+        detail_etag = self.reader_client.get(detail)['ETag']
+        follow_etag = self.reader_client.get(follow)['ETag']
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий'
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = self.reader_client.get(
+            detail, HTTP_IF_NONE_MATCH=detail_etag
+        )
+        self.assertContains(response, 'Комментарий')
+        response = self.reader_client.get(
+            follow, HTTP_IF_NONE_MATCH=follow_etag
+        )
+        self.assertContains(response, 'Пост')
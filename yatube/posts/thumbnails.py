@@ -0,0 +1,158 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import KVStore as CachedDBStore
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+logger = logging.getLogger(__name__)
+
+# Должны совпадать с аргументами тега thumbnail в шаблонах постов.
+POST_GEOMETRY = '960x339'
+POST_OPTIONS = {'crop': 'center', 'upscale': True}
+# Сколько задач на один поток может ждать в очереди.
+QUEUE_PER_WORKER = 8
+
+_lock = threading.Lock()
+_executor = None
+_slots = None
+
+
+def create(name):
+    """Создаёт миниатюру поста, которую потом найдёт тег thumbnail."""
+    try:
+        get_thumbnail(name, POST_GEOMETRY, **POST_OPTIONS)
+        return True
+    except Exception:
+        logger.exception('Не удалось создать миниатюру %s', name)
+        return False
+
+
+def generate(name):
+    """create для потоков пула: у каждого своё соединение с БД."""
+    close_old_connections()
+    try:
+        return create(name)
+    finally:
+        close_old_connections()
+
+
+def _get_executor():
+    global _executor, _slots
+    with _lock:
+        if _executor is None:
+            workers = settings.THUMBNAIL_WORKERS
+            _executor = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix='thumbnails'
+            )
+            _slots = threading.BoundedSemaphore(workers * QUEUE_PER_WORKER)
+    return _executor
+
+
+def schedule(name):
+    """Ставит миниатюру в очередь фонового пула.
+
+    Если очередь заполнена, задача отбрасывается: миниатюру создаст
+    тег thumbnail при первом показе, как и раньше. Без потоков
+    (THUMBNAIL_WORKERS = 0) миниатюра создаётся сразу.
+    """
+    if settings.THUMBNAIL_WORKERS <= 0:
+        create(name)
+        return None
+    executor = _get_executor()
+    if not _slots.acquire(blocking=False):
+        return None
+    future = executor.submit(generate, name)
+    future.add_done_callback(lambda future: _slots.release())
+    return future
+
+
+def schedule_for(post):
+    """Создаёт миниатюру после коммита транзакции, сохранившей пост."""
+    if post.image:
+        name = post.image.name
+        transaction.on_commit(lambda: schedule(name))
+
+
+def _thumbnail_options(source):
+    # Те же умолчания, что подставляет sorl в backend.get_thumbnail.
+    backend = default.backend
+    options = dict(POST_OPTIONS)
+    if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(thumbnail_settings, attr)
+        if value != getattr(default_settings, attr):
+            options.setdefault(key, value)
+    return options
+
+
+def thumbnail_key(image):
+    """Ключ, под которым sorl хранит миниатюру поста в своём KV-хранилище.
+
+    Опирается на внутренние методы бэкенда sorl-thumbnail, проверенные
+    на версии из requirements.txt.
+    """
+    source = ImageFile(image)
+    name = default.backend._get_thumbnail_filename(
+        source, POST_GEOMETRY, _thumbnail_options(source)
+    )
+    return add_prefix(ImageFile(name, default.storage).key)
+
+
+def _group_by_key(posts):
+    keys = {}
+    for post in posts:
+        if post.image:
+            keys.setdefault(thumbnail_key(post.image), []).append(post)
+    return keys
+
+
+def _read_values(keys):
+    """Сериализованные миниатюры по ключам: кэш и один запрос к БД."""
+    kv_cache = default.kvstore.cache
+    values = kv_cache.get_many(keys)
+    missing = [key for key in keys if key not in values]
+    if missing:
+        found = dict(KVStoreModel.objects.filter(
+            key__in=missing
+        ).values_list('key', 'value'))
+        kv_cache.set_many(found, thumbnail_settings.THUMBNAIL_CACHE_TIMEOUT)
+        values.update(found)
+    return values
+
+
+def prefetch(posts):
+    """Достаёт миниатюры всех постов страницы одним запросом к кэшу.
+
+    Найденная миниатюра попадает в post.thumb (url, width, height);
+    для остальных шаблон вызовет тег thumbnail, как раньше. Так же
+    шаблон справится со всей страницей, если хранилище не cached_db
+    или внутренности sorl изменились.
+    """
+    for post in posts:
+        post.thumb = None
+    if not isinstance(default.kvstore, CachedDBStore):
+        return
+    try:
+        keys = _group_by_key(posts)
+    except (AttributeError, TypeError):
+        logger.warning('Предзагрузка миниатюр несовместима с sorl-thumbnail')
+        return
+    if not keys:
+        return
+    for key, value in _read_values(list(keys)).items():
+        if not isinstance(value, str):
+            continue
+        thumb = deserialize_image_file(value)
+        for post in keys[key]:
+            post.thumb = thumb
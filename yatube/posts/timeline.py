@@ -0,0 +1,157 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from . import bulk
+from .models import AuthorStats, Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+BATCH_SIZE = 500
+# Запас на посты, сохранённые позже, чем им была присвоена дата.
+PULL_OVERLAP = timedelta(minutes=1)
+
+
+def pull_key(user_id):
+    return f'timeline_pull:{user_id}'
+
+
+def is_celebrity(author_id):
+    return AuthorStats.objects.filter(
+        user=author_id,
+        followers_count__gt=settings.TIMELINE_FANOUT_LIMIT,
+    ).exists()
+
+
+def celebrity_ids(user):
+    return list(
+        Follow.objects.filter(
+            user=user,
+            author__stats__followers_count__gt=settings.TIMELINE_FANOUT_LIMIT,
+        ).values_list('author', flat=True)
+    )
+
+
+def _bulk_store(entries):
+    bulk.insert(TimelineEntry, entries, BATCH_SIZE, ignore_conflicts=True)
+
+
+def _store(user_id, posts):
+    _bulk_store(
+        TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+        for pk, pub_date in posts
+    )
+
+
+def fan_out(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    if is_celebrity(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author=post.author_id
+    ).values_list('user', flat=True)
+    _bulk_store(
+        TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+        for user_id in followers.iterator()
+    )
+
+
+def backfill(user_id, author_id):
+    _store(
+        user_id,
+        Post.objects.filter(
+            author=author_id
+        ).values_list('id', 'pub_date').iterator(),
+    )
+
+
+def withdraw(post_id):
+    """Убирает пост из всех лент, например при смене автора."""
+    TimelineEntry.objects.filter(post=post_id).delete()
+
+
+def prune(user_id, author_id):
+    TimelineEntry.objects.filter(user=user_id, post__author=author_id).delete()
+
+
+def pull_celebrities(user):
+    """Дочитывает в ленту посты авторов, для которых не было раскладки."""
+    authors = celebrity_ids(user)
+    if not authors:
+        return
+    since = cache.get(pull_key(user.pk))
+    if since is not None:
+        condition = Q(author__in=authors, pub_date__gt=since)
+    else:
+        latest = dict(
+            TimelineEntry.objects.filter(
+                user=user, post__author__in=authors
+            ).values_list('post__author').annotate(
+                last=Max('pub_date')
+            ).order_by()
+        )
+        condition = Q()
+        for author_id in authors:
+            if author_id in latest:
+                last = latest[author_id]
+                condition |= Q(author=author_id, pub_date__gt=last)
+            else:
+                condition |= Q(author=author_id)
+    now = timezone.now()
+    posts = Post.objects.filter(condition).values_list('id', 'pub_date')
+    _store(user.pk, posts.iterator())
+    cache.set(pull_key(user.pk), now - PULL_OVERLAP, None)
+
+
+def entries_for(user):
+    pull_celebrities(user)
+    return TimelineEntry.objects.filter(user=user).select_related(
+        'post__author', 'post__group'
+    )
+
+
+def forget_pulls(user_ids):
+    """Сбрасывает метки дочитывания: лента дочитается по своим записям."""
+    for batch in bulk.chunks(user_ids, BATCH_SIZE):
+        cache.delete_many([pull_key(user_id) for user_id in batch])
+
+
+def rebuild(user_ids=None):
+    """Заполняет ленты заново одним INSERT ... SELECT на стороне БД.
+
+    Посты знаменитостей, как и в fan_out, не раскладываются, а
+    дочитываются при открытии ленты. Удалённые вместе с лентой записи
+    знаменитостей дочитываются заново: метки pull_key сбрасываются
+    после коммита.
+    """
+    follows = Follow.objects.filter(author__posts__isnull=False).exclude(
+        author__stats__followers_count__gt=settings.TIMELINE_FANOUT_LIMIT
+    )
+    entries = TimelineEntry.objects.all()
+    if user_ids is not None:
+        follows = follows.filter(user__in=user_ids)
+        entries = entries.filter(user__in=user_ids)
+    sql, params = follows.values_list(
+        'user', 'author__posts__id', 'author__posts__pub_date'
+    ).order_by().query.sql_with_params()
+    meta = TimelineEntry._meta
+    columns = ', '.join(
+        meta.get_field(name).column for name in ('user', 'post', 'pub_date')
+    )
+    with transaction.atomic():
+        entries.delete()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {meta.db_table} ({columns}) {sql}', params
+            )
+        if user_ids is None:
+            transaction.on_commit(lambda: forget_pulls(
+                User.objects.values_list('pk', flat=True).iterator()
+            ))
+        else:
+            transaction.on_commit(lambda: forget_pulls(user_ids))
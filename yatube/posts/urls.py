@@ -25,6 +25,11 @@ urlpatterns = [
         views.post_detail,
         name='post_detail'
     ),
+    path(
+        'search/',
+        views.post_search,
+        name='search'
+    ),
     path(
         'create/',
         views.post_create,
@@ -35,6 +40,11 @@ urlpatterns = [
         views.post_edit,
         name='post_edit'
     ),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.post_comments,
+        name='post_comments'
+    ),
     path(
         'posts/<int:post_id>/comment/',
         views.add_comment,
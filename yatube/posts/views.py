@@ -1,62 +1,180 @@
 from django.conf import settings
-from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
-from django.views.decorators.cache import cache_page
+from django.http import Http404
 from django.shortcuts import get_object_or_404, redirect, render
+from django.views.decorators.http import condition
 
+from . import cache, counts, lookups, search, thumbnails, timeline
+from .cache import cache_feed
 from .forms import CommentForm, PostForm
-from .models import Comment, Follow, Group, Post
+from .models import Comment, Follow, Post
+from .paginators import CachedCountPaginator, CursorPaginator
 
-User = get_user_model()
 
+def is_cursor_request(request):
+    if 'after' in request.GET or 'before' in request.GET:
+        return True
+    return settings.POSTS_CURSOR_PAGINATION and 'page' not in request.GET
 
-def my_paginator(request, post_list):
-    paginator = Paginator(post_list, settings.POSTS_PER_PAGE)
+
+def my_paginator(request, post_list, count_scope=None,
+                 ordering=('-pub_date', '-id')):
+    if is_cursor_request(request):
+        paginator = CursorPaginator(
+            post_list, settings.POSTS_PER_PAGE, ordering=ordering
+        )
+        return paginator.get_page(
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+        )
+    paginator = CachedCountPaginator(
+        post_list, settings.POSTS_PER_PAGE, count_scope=count_scope
+    )
     page_number = request.GET.get('page')
     return paginator.get_page(page_number)
 
 
-@cache_page(20)
+def index_scopes(request):
+    return [cache.FEED_SCOPE]
+
+
+@condition(etag_func=cache.page_etag(index_scopes))
+@cache_feed(index_scopes)
 def index(request):
     post_list = Post.objects.select_related('group', 'author')
-    context = {'page_obj': my_paginator(request, post_list)}
+    page_obj = my_paginator(request, post_list, counts.GLOBAL_SCOPE)
+    thumbnails.prefetch(page_obj)
+    context = {'page_obj': page_obj}
     return render(request, 'posts/index.html', context)
 
 
+def group_scopes(request, slug):
+    # Несуществующие страницы не кэшируются: промах помнит lookups.
+    if lookups.groups.get(slug) is None:
+        return None
+    return [cache.group_scope(slug), cache.USERS_SCOPE]
+
+
+@condition(etag_func=cache.page_etag(group_scopes))
+@cache_feed(group_scopes)
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
+    group = lookups.get_or_404(lookups.groups, slug)
     post_list = group.posts.select_related('author')
-    context = {'group': group, 'page_obj': my_paginator(request, post_list)}
+    page_obj = my_paginator(
+        request, post_list, counts.group_scope(group.pk)
+    )
+    thumbnails.prefetch(page_obj)
+    context = {'group': group, 'page_obj': page_obj}
     return render(request, 'posts/group_list.html', context)
 
 
-def profile(request, username):
-    user = get_object_or_404(User, username=username)
-    post_list = user.posts.select_related('group', 'author')
-    follow = False
-    if request.user.is_authenticated:
-        follow = Follow.objects.filter(user=request.user, author=user).exists()
+def profile_fill(request, username):
+    following = request.user.is_authenticated and Follow.objects.filter(
+        user=request.user, author__username=username
+    ).exists()
+    return {'following': following}
+
+
+def render_profile(request, author, following=False):
+    post_list = author.posts.select_related('group', 'author')
+    page_obj = my_paginator(
+        request, post_list, counts.author_scope(author.pk)
+    )
+    thumbnails.prefetch(page_obj)
     context = {
-        'author': user,
-        'page_obj': my_paginator(request, post_list),
-        'following': follow,
+        'author': author,
+        'page_obj': page_obj,
+        'following': following,
     }
     return render(request, 'posts/profile.html', context)
 
 
+def profile_scopes(request, username):
+    if lookups.authors.get(username) is None:
+        return None
+    return [cache.author_scope(username)]
+
+
+@condition(etag_func=cache.page_etag(profile_scopes))
+@cache_feed(profile_scopes, fill_context=profile_fill)
+def profile(request, username):
+    return render_profile(
+        request, lookups.get_or_404(lookups.authors, username)
+    )
+
+
+@cache.once_per_request
+def post_detail_scopes(request, post_id):
+    keys = Post.objects.filter(pk=post_id).values_list(
+        'author__username', 'group__slug'
+    ).first()
+    if keys is None:
+        return None
+    username, slug = keys
+    scopes = [
+        cache.post_scope(post_id),
+        cache.author_scope(username),
+        cache.USERS_SCOPE,
+    ]
+    if slug is not None:
+        scopes.append(cache.group_scope(slug))
+    return scopes
+
+
+@condition(etag_func=cache.page_etag(post_detail_scopes))
+@cache_feed(
+    post_detail_scopes,
+    fill_context=lambda request, post_id: {'form': CommentForm()},
+)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), pk=post_id
+    )
+    thumbnails.prefetch([post])
     form = CommentForm()
-    comments = Comment.objects.filter(post=post_id)
     context = {
         'post': post,
         'form': form,
-        'comments': comments,
+        'comments': comments_page(request, post_id),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def comments_page(request, post_id):
+    paginator = CursorPaginator(
+        Comment.objects.filter(post=post_id).select_related('author'),
+        settings.COMMENTS_PER_PAGE,
+        ordering=('-created', '-id'),
+    )
+    return paginator.get_page(after=request.GET.get('after'))
+
+
+@cache_feed(
+    lambda request, post_id: [cache.post_scope(post_id), cache.USERS_SCOPE]
+)
+def post_comments(request, post_id):
+    comments = comments_page(request, post_id)
+    # Пустая страница не должна кэшироваться для несуществующего поста.
+    if not comments and not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    context = {
+        'post_id': post_id,
+        'comments': comments,
+    }
+    return render(request, 'posts/includes/comment_list.html', context)
+
+
+def post_search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = None
+    if query:
+        page_obj = search.find_posts(
+            query, settings.POSTS_PER_PAGE, after=request.GET.get('after')
+        )
+    context = {'query': query, 'page_obj': page_obj}
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def post_create(request):
     form = PostForm(
@@ -67,6 +185,7 @@ def post_create(request):
         post = form.save(commit=False)
         post.author = request.user
         form.save()
+        thumbnails.schedule_for(post)
         return redirect('posts:profile', request.user)
     context = {'form': form}
     return render(request, 'posts/create_post.html', context)
@@ -84,6 +203,8 @@ def post_edit(request, post_id):
     )
     if form.is_valid():
         form.save()
+        if 'image' in form.changed_data:
+            thumbnails.schedule_for(post)
         return redirect('posts:post_detail', post_id=post_id)
     context = {'form': form, 'is_edit': True}
     return render(request, 'posts/create_post.html', context)
@@ -100,41 +221,37 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+def follow_scopes(request):
+    return [cache.FEED_SCOPE, cache.follower_scope(request.user.pk)]
+
+
 @login_required
+@condition(etag_func=cache.page_etag(follow_scopes))
 def follow_index(request):
-    follow_list = Follow.objects.filter(user=request.user)
-    post_list = Post.objects.filter(author__in=follow_list.values('author'))
-    context = {'page_obj': my_paginator(request, post_list)}
+    entries = timeline.entries_for(request.user)
+    page_obj = my_paginator(
+        request,
+        entries,
+        counts.follow_scope(request.user.pk),
+        ordering=('-pub_date', '-post_id'),
+    )
+    page_obj.object_list = [entry.post for entry in page_obj]
+    thumbnails.prefetch(page_obj)
+    context = {'page_obj': page_obj}
     return render(request, 'posts/follow.html', context)
 
 
 @login_required
 def profile_follow(request, username):
-    author = get_object_or_404(User, username=username)
-    if request.user == author or Follow.objects.filter(
-            user=request.user, author=author).exists():
-        return profile(request, username)
-    follow = Follow()
-    follow.user = request.user
-    follow.author = author
-    follow.save()
-    post_list = author.posts.select_related('group', 'author')
-    context = {
-        'author': author,
-        'page_obj': my_paginator(request, post_list),
-        'following': True
-    }
-    return render(request, 'posts/profile.html', context)
+    author = lookups.get_or_404(lookups.authors, username)
+    if request.user == author:
+        return render_profile(request, author, False)
+    Follow.objects.get_or_create(user=request.user, author=author)
+    return render_profile(request, author, True)
 
 
 @login_required
 def profile_unfollow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = lookups.get_or_404(lookups.authors, username)
     Follow.objects.filter(user=request.user, author=author).delete()
-    post_list = author.posts.select_related('group', 'author')
-    context = {
-        'author': author,
-        'page_obj': my_paginator(request, post_list),
-        'following': False
-    }
-    return render(request, 'posts/profile.html', context)
+    return render_profile(request, author, False)
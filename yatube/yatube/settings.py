@@ -56,8 +56,12 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
 ]
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.PerformanceMiddleware',
+    'core.middleware.NPlusOneMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -69,16 +73,65 @@ MIDDLEWARE = [
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Изменяемые данные работающего сайта (метрики, файловый кэш) - вне
+# исходников; в боевом окружении задаётся через YATUBE_VAR_DIR
+VAR_DIR = os.environ.get('YATUBE_VAR_DIR', os.path.join(BASE_DIR, 'var'))
+# Файлы метрик процессов; каталог общий для всех воркеров
+METRICS_DIR = os.path.join(VAR_DIR, 'metrics')
 
 STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
 
 POSTS_PER_PAGE = 10
+COMMENTS_PER_PAGE = 20
+# Курсорная пагинация (?after=/?before=) вместо номеров страниц по умолчанию
+POSTS_CURSOR_PAGINATION = False
+# Срок жизни счётчиков постов для пагинатора (сверка - reconcile_post_counts)
+POST_COUNT_CACHE_TIMEOUT = 60 * 60 * 24
+# Числа постов в лентах подписок не обновляются при публикации, а
+# пересчитываются по истечении этого срока
+FOLLOW_COUNT_CACHE_TIMEOUT = 60
+# Посты авторов с большим числом подписчиков не раскладываются по лентам
+# при публикации, а дочитываются при открытии ленты подписок
+TIMELINE_FANOUT_LIMIT = 1000
+# Срок жизни кэша лент; изменения сбрасывают его сразу через поколения
+FEED_CACHE_TIMEOUT = 60 * 15
+# Сколько после срока отдавать прежний каркас, пока его пересобирает другой
+# запрос или пока недоступна база
+FEED_CACHE_GRACE = 60 * 5
+# Срок блокировки, под которой один запрос пересобирает каркас
+FEED_CACHE_LOCK_TIMEOUT = 30
+# Коэффициент раннего пересчёта каркаса до срока (XFetch); 0 - отключить
+FEED_CACHE_EARLY_REFRESH = 1.0
+# Группы и авторы по slug и username в памяти процесса; промахи (несуществующие
+# адреса) хранятся меньше
+LOOKUP_CACHE_SIZE = 1000
+LOOKUP_CACHE_TIMEOUT = 60 * 5
+LOOKUP_CACHE_MISS_TIMEOUT = 60
+# Потоки, создающие миниатюры загруженных картинок вне запроса
+THUMBNAIL_WORKERS = 2
+# Доля запросов с замером SQL, шаблонов и кэша (Server-Timing и лог)
+PERFORMANCE_SAMPLE_RATE = 0.01
+# Сколько запросов одной формы допустимо на страницу (DEBUG и тесты)
+NPLUSONE_THRESHOLD = 3
 
 ROOT_URLCONF = 'yatube.urls'
+# Небольшой кэш в памяти процесса поверх общего для всех процессов;
+# в боевом окружении общий кэш - Redis или Memcached
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'BACKEND': 'core.cache.TwoTierCache',
+        'LOCATION': 'shared',
+        'OPTIONS': {
+            'MAX_ENTRIES': 1000,
+        },
+    },
+    'shared': {
+        'BACKEND': 'core.cache.FileCache',
+        'LOCATION': os.path.join(VAR_DIR, 'cache'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
 }
 
 
@@ -152,6 +205,28 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core.performance': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'core.nplusone': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
 """
 if DEBUG:
     import logging